@@ -0,0 +1,159 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is the batch version of Task 1.3 of question_1.py (change_minimal and highlight_difference).
+# It makes many random strings, changes one character of every string a number of times, and compares the SHA-256
+# of every pair bit by bit with NumPy (XOR, then unpackbits to count the flipped bits), in batches so millions of pairs fit in memory.
+# A good hash flips about half of the 256 bits (the avalanche effect), and every bit flips with a probability of about 0.5.
+# The hashes can be computed with hashlib or with the vectorized SHA-256 of numpy_miner.py, to check that backend. Example:
+#   python3 avalanche.py --inputs 100000 --mutations 10 --length 16 --backend numpy --output avalanche.json
+
+from hashlib import sha256
+from time import perf_counter
+from typing import Optional
+import argparse
+import json
+
+import numpy as np
+
+import numpy_miner
+
+
+BATCH_SIZE: int = 65536 # Number of pairs compared at once
+DIGEST_BITS: int = 256
+BACKENDS: tuple[str, ...] = ("hashlib", "numpy")
+
+
+def random_messages(count: int, length: int, generator: np.random.Generator) -> np.ndarray:
+    """This function makes random lowercase strings (like the input of question 1) as a (count, length) array of bytes."""
+    return generator.integers(97, 123, size=(count, length), dtype=np.uint8)
+
+
+def change_minimal(messages: np.ndarray, generator: np.random.Generator) -> np.ndarray:
+    """
+    This function is the vectorized change_minimal of question_1.py: it changes one random character of every message
+    to another random lowercase letter. Adding 1 to 25 (modulo 26) makes sure the new letter is different.
+    """
+    mutated = messages.copy()
+    rows = np.arange(len(messages))
+    positions = generator.integers(0, messages.shape[1], size=len(messages))
+    offsets = generator.integers(1, 26, size=len(messages), dtype=np.uint8)
+    mutated[rows, positions] = (mutated[rows, positions] - 97 + offsets) % 26 + 97
+    return mutated
+
+
+def digests_hashlib(messages: np.ndarray) -> np.ndarray:
+    """This function hashes every row with hashlib and returns the digests as a (count, 32) array of bytes."""
+    joined = b"".join(sha256(row).digest() for row in messages)
+    return np.frombuffer(joined, dtype=np.uint8).reshape(-1, 32)
+
+
+def digests_numpy(messages: np.ndarray) -> np.ndarray:
+    """
+    This function hashes every row with the vectorized SHA-256 of numpy_miner.py, all the rows at the same time.
+    All the rows have the same length, so they have the same padding.
+    """
+    count, length = messages.shape
+    padding = np.frombuffer(numpy_miner.pad_message(bytes(length))[length:], dtype=np.uint8)
+    padded = np.concatenate([messages, np.broadcast_to(padding, (count, len(padding)))], axis=1)
+    words = np.ascontiguousarray(padded).view(">u4").astype(np.uint32) # (count, 16 * blocks)
+
+    state = [np.full(count, value, dtype=np.uint32) for value in numpy_miner.INITIAL_STATE]
+    for block_start in range(0, words.shape[1], 16):
+        state = numpy_miner.compress(state, [words[:, index] for index in range(block_start, block_start + 16)])
+    return np.stack(state, axis=1).astype(">u4").view(np.uint8).reshape(count, 32)
+
+
+def flipped_bits(original: np.ndarray, changed: np.ndarray) -> np.ndarray:
+    """This function returns which of the 256 bits differ between every pair of digests, as a (count, 256) array of 0 and 1."""
+    return np.unpackbits(original ^ changed, axis=1)
+
+
+class AvalancheReport:
+    """This class adds up the flipped bits of all the batches."""
+    pairs: int
+    histogram: np.ndarray # histogram[distance] is the number of pairs whose digests differ in that many bits
+    bit_flips: np.ndarray # bit_flips[bit] is the number of pairs where that bit flipped
+
+
+    def __init__(self) -> None:
+        self.pairs = 0
+        self.histogram = np.zeros(DIGEST_BITS + 1, dtype=np.int64)
+        self.bit_flips = np.zeros(DIGEST_BITS, dtype=np.int64)
+
+
+    def add(self, flips: np.ndarray) -> None:
+        """This method adds a batch of flipped bits (see flipped_bits)."""
+        distances = flips.sum(axis=1, dtype=np.int64)
+        self.histogram += np.bincount(distances, minlength=DIGEST_BITS + 1)
+        self.bit_flips += flips.sum(axis=0, dtype=np.int64)
+        self.pairs += len(flips)
+
+
+    def to_dict(self) -> dict:
+        """This method returns the Hamming distance distribution and the flip probability of every bit."""
+        distances = np.arange(DIGEST_BITS + 1)
+        mean = float((self.histogram * distances).sum() / self.pairs)
+        variance = float((self.histogram * (distances - mean) ** 2).sum() / self.pairs)
+        probabilities = self.bit_flips / self.pairs
+        return {
+            "pairs": self.pairs,
+            "hamming_distance": {
+                "mean": mean,
+                "stdev": variance ** 0.5,
+                "expected_mean": DIGEST_BITS / 2,
+                "expected_stdev": (DIGEST_BITS / 4) ** 0.5, # The binomial distribution with p = 0.5
+                "min": int(np.flatnonzero(self.histogram)[0]),
+                "max": int(np.flatnonzero(self.histogram)[-1]),
+                "histogram": {str(distance): int(count) for distance, count in enumerate(self.histogram) if count},
+            },
+            "bit_flip_probability": {
+                "min": float(probabilities.min()),
+                "max": float(probabilities.max()),
+                "max_deviation_from_half": float(np.abs(probabilities - 0.5).max()),
+                "per_bit": [round(float(probability), 6) for probability in probabilities],
+            },
+        }
+
+
+def analyze(inputs: int, mutations: int, length: int, backend: str = "hashlib", seed: Optional[int] = None) -> AvalancheReport:
+    """This function compares the digest of every input with the digests of its mutations, batch by batch."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown hash backend: { backend }")
+    hash_messages = digests_numpy if backend == "numpy" else digests_hashlib
+    generator = np.random.default_rng(seed)
+    report = AvalancheReport()
+
+    inputs_per_batch = max(1, BATCH_SIZE // mutations)
+    for batch_start in range(0, inputs, inputs_per_batch):
+        messages = random_messages(min(inputs_per_batch, inputs - batch_start), length, generator)
+        originals = hash_messages(messages)
+        for _ in range(mutations):
+            report.add(flipped_bits(originals, hash_messages(change_minimal(messages, generator))))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the avalanche effect of SHA-256 over many one-character changes.")
+    parser.add_argument("--inputs", type=int, default=10_000, help="number of random strings")
+    parser.add_argument("--mutations", type=int, default=10, help="number of one-character changes of every string")
+    parser.add_argument("--length", type=int, default=16, help="the length of the strings")
+    parser.add_argument("--backend", default="hashlib", choices=BACKENDS, help="the SHA-256 implementation to check")
+    parser.add_argument("--seed", type=int, help="the seed of the random strings, to repeat a run")
+    parser.add_argument("--output", help="save the JSON report to this file")
+    arguments = parser.parse_args()
+
+    start = perf_counter()
+    report = analyze(arguments.inputs, arguments.mutations, arguments.length, arguments.backend, arguments.seed).to_dict()
+    elapsed = perf_counter() - start
+
+    distance = report["hamming_distance"]
+    flip = report["bit_flip_probability"]
+    print(f"{ report['pairs']:,} pairs in { elapsed:.2f} seconds ({ report['pairs'] / elapsed:,.0f} pairs/second)")
+    print(f"Hamming distance: mean { distance['mean']:.3f} (expected { distance['expected_mean']:.0f}), stdev { distance['stdev']:.3f} (expected { distance['expected_stdev']:.0f}), min { distance['min'] }, max { distance['max'] }")
+    print(f"Bit flip probability: min { flip['min']:.4f}, max { flip['max']:.4f}, largest deviation from 0.5: { flip['max_deviation_from_half']:.4f}")
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved the report to { arguments.output }")
@@ -0,0 +1,199 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This program measures the performance of the real functions of question 1, 3 and 4,
+# so the runs can be compared with each other and a slower version can be caught early.
+# Every benchmark is run a few times without measuring (warm-up), then measured for a number of repetitions.
+# The result is printed (or saved) as JSON. Example:
+#   python3 benchmark.py --repetitions 20 --difficulties 2 3 4 --workers 1 2 4 --output result.json
+
+from time import perf_counter, time as unix_time
+from typing import Callable, Optional
+from hashlib import sha256
+from contextlib import redirect_stdout
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+
+import question_1
+import question_3
+import question_4
+from signing_service import SigningService
+
+
+PERCENTILES: tuple[int, ...] = (50, 90, 95, 99)
+
+
+def percentile(sorted_samples: list[float], percent: float) -> float:
+    """This function returns the percentile of the sorted samples using the nearest-rank method."""
+    index = max(0, min(len(sorted_samples) - 1, round(percent / 100 * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[index]
+
+
+def measure(function: Callable[[], Optional[int]], repetitions: int, warmup: int) -> dict:
+    """
+    This function runs the function warmup times without measuring, then measures it for the given repetitions.
+    The function may return the number of operations it did, which is used to compute the operations per second.
+    """
+    for _ in range(warmup):
+        function()
+
+    samples: list[float] = []
+    total_operations = 0
+    for _ in range(repetitions):
+        start = perf_counter()
+        operations = function() or 1
+        samples.append(perf_counter() - start)
+        total_operations += operations
+
+    sorted_samples = sorted(samples)
+    total_seconds = sum(samples)
+    result = {
+        "repetitions": repetitions,
+        "warmup": warmup,
+        "mean_operations_per_repetition": total_operations / repetitions,
+        # The number of operations can change between repetitions (e.g. the attempts of mining), so the whole run is used
+        "operations_per_second": total_operations / total_seconds if total_seconds > 0 else 0.0,
+        "mean_seconds": statistics.fmean(samples),
+        "stdev_seconds": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "min_seconds": sorted_samples[0],
+        "max_seconds": sorted_samples[-1],
+    }
+    for percent in PERCENTILES:
+        result[f"p{ percent }_seconds"] = percentile(sorted_samples, percent)
+    return result
+
+
+def benchmark_hash_block(hashes: int) -> Callable[[], int]:
+    """This function prepares the benchmark of Block.hash_block."""
+    block = question_4.Block(1, "Benchmark data", question_4.GENESIS_PREVIOUS_HASH)
+    block.confirm_time = unix_time()
+
+    def run() -> int:
+        for nonce in range(hashes):
+            block.nonce = nonce
+            question_4.Block.hash_block(block)
+        return hashes
+    return run
+
+
+def benchmark_mine(difficulty: int, workers: int) -> Callable[[], int]:
+    """This function prepares the benchmark of Block.mine, every repetition mines a new block."""
+    def run() -> int:
+        question_4.DIFFICULTY = difficulty
+        block = question_4.Block(1, "Benchmark data", question_4.GENESIS_PREVIOUS_HASH)
+        # The mining always prints a few lines, they are not part of the result
+        with redirect_stdout(io.StringIO()):
+            metrics = block.mine(workers=workers)
+        return metrics.attempts
+    return run
+
+
+def benchmark_brute_force(candidates: int) -> Callable[[], int]:
+    """This function prepares the benchmark of the brute force loop of question 1 (without the printing)."""
+    def run() -> int:
+        current_value = None
+        for _ in range(candidates):
+            current_value = question_1.create_sequence_string(current_value)
+            sha256(current_value.encode()).hexdigest()
+        return candidates
+    return run
+
+
+def benchmark_rsa(operations: int, service: SigningService) -> dict[str, Callable[[], int]]:
+    """
+    This function prepares the benchmarks of the RSA functions of question 3, and of the batches of signing_service.py
+    that run on the given service (the caller closes it).
+    """
+    private_key = question_3.generate_key_pair()
+    public_key = private_key.public_key()
+    message = b"Benchmark message"
+    signature = question_3.sign_message(private_key, message)
+    ciphertext = question_3.encrypt_message(public_key, message)
+    messages = [message] * operations
+    signatures = [signature] * operations
+
+    def repeat(function: Callable[[], object], times: int = operations) -> Callable[[], int]:
+        def run() -> int:
+            for _ in range(times):
+                function()
+            return times
+        return run
+
+    return {
+        # Key generation is much slower than the other operations, so it is only done once per repetition
+        "rsa_keygen": repeat(question_3.generate_key_pair, times=1),
+        "rsa_sign": repeat(lambda: question_3.sign_message(private_key, message)),
+        "rsa_verify": repeat(lambda: question_3.verify_signature(public_key, message, signature)),
+        "rsa_encrypt": repeat(lambda: question_3.encrypt_message(public_key, message)),
+        "rsa_decrypt": repeat(lambda: question_3.decrypt_message(private_key, ciphertext)),
+        # The batches sign or verify the same number of messages as the other benchmarks, with a thread pool
+        "rsa_sign_batch": lambda: len(service.sign_many(private_key, messages).results),
+        "rsa_verify_batch": lambda: len(service.verify_many(public_key, messages, signatures).results),
+    }
+
+
+def run_benchmarks(arguments: argparse.Namespace) -> dict:
+    """This function runs the selected benchmarks and collects the results with some information about the machine."""
+    question_4.DEBUG = False  # The live progress line is not part of the result
+    original_difficulty = question_4.DIFFICULTY
+    results: dict[str, dict] = {}
+
+    def run(name: str, function: Callable[[], Optional[int]], **parameters) -> None:
+        print(f"Running { name }...", flush=True)
+        results[name] = {"parameters": parameters, **measure(function, arguments.repetitions, arguments.warmup)}
+
+    if "hash_block" in arguments.only:
+        run("hash_block", benchmark_hash_block(arguments.hashes), hashes=arguments.hashes)
+
+    if "mine" in arguments.only:
+        for difficulty in arguments.difficulties:
+            for workers in sorted(set(arguments.workers)):
+                run(f"mine_difficulty_{ difficulty }_workers_{ workers }", benchmark_mine(difficulty, workers), difficulty=difficulty, workers=workers)
+        question_4.DIFFICULTY = original_difficulty
+
+    if "brute_force" in arguments.only:
+        run("brute_force", benchmark_brute_force(arguments.candidates), candidates=arguments.candidates)
+
+    if "rsa" in arguments.only:
+        threads = max(arguments.workers)
+        with SigningService(threads) as service:
+            for name, function in benchmark_rsa(arguments.rsa_operations, service).items():
+                run(name, function, key_size=question_3.KEY_SIZE, **({"threads": threads} if name.endswith("_batch") else {}))
+
+    return {
+        "created_at": unix_time(),
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hashing, mining, brute force and RSA functions.")
+    parser.add_argument("--only", nargs="+", default=["hash_block", "mine", "brute_force", "rsa"], choices=["hash_block", "mine", "brute_force", "rsa"], help="the benchmarks to run")
+    parser.add_argument("--repetitions", type=int, default=10, help="number of measured repetitions of every benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="number of repetitions that are run before measuring")
+    parser.add_argument("--hashes", type=int, default=100_000, help="number of Block.hash_block calls per repetition")
+    parser.add_argument("--difficulties", type=int, nargs="+", default=[2, 3, 4], help="the difficulties to mine with")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="the numbers of mining processes")
+    parser.add_argument("--candidates", type=int, default=100_000, help="number of brute force candidates per repetition")
+    parser.add_argument("--rsa-operations", type=int, default=50, help="number of RSA sign/verify/encrypt/decrypt calls per repetition")
+    parser.add_argument("--output", help="save the JSON to this file instead of printing it")
+    arguments = parser.parse_args()
+
+    report = run_benchmarks(arguments)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved the result to { arguments.output }")
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,315 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This program exports a chain (a ChainStore or a list of blocks) to a file and imports it into a ChainStore,
+# e.g. to copy a chain to another machine. There are two formats:
+# - binary: MAGIC, then one record per block: length (4 bytes) | CRC32 of the block (4 bytes) | the block (Block.to_bytes),
+# - JSON lines (files ending with ".jsonl"): one JSON object per block with all its fields, easy to read and to process.
+# The blocks are written and read one at a time with generators, so a chain of millions of blocks never is in memory at once.
+# The import checks the blocks with ChainValidator batch by batch before they are stored, and both directions can resume:
+# the export continues after the last complete block of the file, and the import continues after the last block of the store.
+# Example:
+#   python3 chain_export.py export chain chain.bin
+#   python3 chain_export.py import chain.bin copy --workers 4
+
+from itertools import islice
+from time import perf_counter
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+from zlib import crc32
+import argparse
+import json
+import os
+import struct
+
+from chain_store import RECORD_HEADER_STRUCT, ChainStore
+from chain_validator import CHUNK_SIZE, ChainValidator, InvalidBlockError
+from question_4 import HEADER_STRUCT, Block, next_target, target_from_bits
+
+
+MAGIC: bytes = b"CHAINEX1"
+FORMATS: tuple[str, ...] = ("binary", "jsonl")
+IMPORT_BATCH_SIZE: int = 4 * CHUNK_SIZE # Number of blocks validated and stored at once by import_chain
+SCAN_BUFFER_SIZE: int = 1024 * 1024 # Bytes read at once when counting the lines of a JSON lines file
+
+
+def format_of(path: str) -> str:
+    """This function returns the format of an export file from its extension."""
+    return "jsonl" if path.endswith(".jsonl") else "binary"
+
+
+def block_to_json(block: Block) -> dict:
+    """This function returns all the fields of a block as a JSON object, with the bytes in hexadecimal."""
+    record = {
+        "height": block.block_counter,
+        "hash": Block.hash_block(block),
+        "block_id": block.block_id,
+        "timestamp": block.timestamp,
+        "items": list(block.items),
+        "merkle_root": block.merkle_root.hex(),
+        "previous_hash": block.previous_hash,
+        "target": block.target.to_bytes(32, "big").hex(),
+        "confirm_time": block.confirm_time,
+        "producer": block.producer_fingerprint.hex(),
+        "nonce": block.nonce,
+    }
+    if block.signature:
+        record["producer_key"] = block.producer_key.decode()
+        record["signature"] = block.signature.hex()
+    return record
+
+
+def _field(record: dict, name: str, kind: Union[type, tuple[type, ...]]):
+    """This function returns a field of a JSON record, it raises ValueError if it is missing or has another type."""
+    value = record.get(name)
+    # bool is a subclass of int, but true and false are not valid numbers of a block
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise ValueError(f"The field { name } is missing or has the wrong type")
+    return value
+
+
+def block_from_json(record: dict) -> Block:
+    """
+    This function rebuilds a block from block_to_json. It raises ValueError if a field is missing, has the wrong type
+    or does not fit in the header, or if the items or the hash do not match.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("The record is not a JSON object")
+    items = _field(record, "items", list)
+    if not all(isinstance(item, str) for item in items):
+        raise ValueError("The field items has the wrong type")
+    try:
+        header = HEADER_STRUCT.pack(
+            _field(record, "height", int),
+            bytes.fromhex(_field(record, "block_id", str)),
+            _field(record, "timestamp", (int, float)),
+            bytes.fromhex(_field(record, "merkle_root", str)),
+            bytes.fromhex(_field(record, "previous_hash", str)),
+            bytes.fromhex(_field(record, "target", str)),
+            _field(record, "confirm_time", (int, float)),
+            bytes.fromhex(_field(record, "producer", str)),
+            _field(record, "nonce", int),
+        )
+    except struct.error as error:
+        raise ValueError(f"The fields do not fit in the header: { error }") from error
+    block = Block.from_header(header, items)
+    if Block.hash_block(block) != _field(record, "hash", str):
+        raise ValueError(f"The hash of the block at height { record['height'] } does not match its fields")
+    if "signature" in record:
+        block.producer_key = _field(record, "producer_key", str).encode()
+        block.signature = bytes.fromhex(_field(record, "signature", str))
+    return block
+
+
+def encode_blocks(blocks: Iterable[Block], format: str) -> Iterator[bytes]:
+    """This function yields every block as a record of the format (without the MAGIC of the binary format)."""
+    for block in blocks:
+        if format == "jsonl":
+            yield json.dumps(block_to_json(block), separators=(",", ":")).encode() + b"\n"
+        else:
+            raw = block.to_bytes()
+            yield RECORD_HEADER_STRUCT.pack(len(raw), crc32(raw)) + raw
+
+
+def _read_binary(file: BinaryIO, skip: int) -> Iterator[Block]:
+    """This function yields the blocks of a binary export, the first blocks are skipped without being read."""
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("The file is not a binary chain export")
+
+    number = 0
+    while True:
+        record_header = file.read(RECORD_HEADER_STRUCT.size)
+        if not record_header:
+            return
+        if len(record_header) != RECORD_HEADER_STRUCT.size:
+            raise ValueError(f"The record of block { number } is not complete")
+        length, checksum = RECORD_HEADER_STRUCT.unpack(record_header)
+
+        if number < skip:
+            file.seek(length, os.SEEK_CUR)
+        else:
+            raw = file.read(length)
+            if len(raw) != length:
+                raise ValueError(f"The record of block { number } is not complete")
+            if crc32(raw) != checksum:
+                raise ValueError(f"The record of block { number } is corrupted")
+            try:
+                block = Block.from_bytes(raw)
+            except (ValueError, struct.error) as error:
+                raise ValueError(f"The record of block { number } is not a valid block: { error }") from error
+            yield block
+        number += 1
+
+
+def _read_jsonl(file: BinaryIO, skip: int) -> Iterator[Block]:
+    """This function yields the blocks of a JSON lines export, the first lines are skipped without being parsed."""
+    for number, line in enumerate(file):
+        if number < skip:
+            continue
+        if not line.endswith(b"\n"):
+            raise ValueError(f"The line of block { number } is not complete")
+        try:
+            block = block_from_json(json.loads(line))
+        except ValueError as error:
+            raise ValueError(f"Line { number + 1 } is not a valid block: { error }") from error
+        yield block
+
+
+def read_blocks(file: BinaryIO, format: str, skip: int = 0) -> Iterator[Block]:
+    """This function streams the blocks of an export file opened in binary mode, after skipping the first blocks."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: { format }")
+    return _read_jsonl(file, skip) if format == "jsonl" else _read_binary(file, skip)
+
+
+def _complete_records(path: str, format: str) -> tuple[int, int]:
+    """
+    This function returns the number of complete records of an export file and the size of the file up to the end of the
+    last of them, so an interrupted export can be cut there and continued.
+    """
+    size = os.path.getsize(path)
+    count = 0
+    with open(path, "rb") as file:
+        if format == "jsonl":
+            end = 0
+            position = 0
+            while chunk := file.read(SCAN_BUFFER_SIZE):
+                count += chunk.count(b"\n")
+                if b"\n" in chunk:
+                    end = position + chunk.rindex(b"\n") + 1
+                position += len(chunk)
+            return count, end
+
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{ path } is not a binary chain export")
+        end = len(MAGIC)
+        while end + RECORD_HEADER_STRUCT.size <= size:
+            file.seek(end)
+            length, _ = RECORD_HEADER_STRUCT.unpack(file.read(RECORD_HEADER_STRUCT.size))
+            if end + RECORD_HEADER_STRUCT.size + length > size:
+                break
+            end += RECORD_HEADER_STRUCT.size + length
+            count += 1
+        return count, end
+
+
+def export_chain(blocks: Union[ChainStore, list[Block]], path: str, format: Optional[str] = None, resume: bool = False) -> int:
+    """
+    This function writes the blocks to an export file and returns the number of blocks written.
+    With resume, an existing file is continued after its last complete block instead of being written again.
+    """
+    format = format or format_of(path)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: { format }")
+
+    start = 0
+    if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+        start, end = _complete_records(path, format)
+        if start > len(blocks):
+            raise ValueError(f"{ path } has more blocks than the chain")
+        os.truncate(path, end)
+    else:
+        with open(path, "wb") as file:
+            if format == "binary":
+                file.write(MAGIC)
+
+    remaining = blocks.iter_from(start) if isinstance(blocks, ChainStore) else islice(blocks, start, None)
+    written = 0
+    with open(path, "ab") as file:
+        for record in encode_blocks(remaining, format):
+            file.write(record)
+            written += 1
+    return written
+
+
+def _store_batch(validator: ChainValidator, store: ChainStore, batch: list[Block]) -> None:
+    """
+    This function validates a batch of blocks after the tip of the validator and appends them to the store.
+    The valid blocks before an invalid block are stored before the InvalidBlockError is raised.
+    """
+    first_height = validator.tip_height + 1
+    try:
+        if validator.tip_hash is None:
+            validator.validate(batch)
+        else:
+            validator.validate_appended(batch)
+    except InvalidBlockError as error:
+        for block in batch[:error.height - first_height]:
+            store.append(block)
+        raise
+    for block in batch:
+        store.append(block)
+
+
+def import_chain(path: str, store: ChainStore, format: Optional[str] = None, workers: int = 1, block_interval: Optional[float] = None, require_signatures: bool = False, genesis_target: Optional[int] = None) -> int:
+    """
+    This function validates the blocks of an export file and appends them to the store, batch by batch,
+    and returns the number of blocks imported. If the store already has blocks (e.g. an interrupted import),
+    the import continues after its last block, which the next block of the file must link to.
+    If the file is cut off or has an invalid block, the blocks before it are stored before the error is raised,
+    so the import can be continued from there with a good file.
+    """
+    format = format or format_of(path)
+    validator = ChainValidator(genesis_target, workers, block_interval, require_signatures)
+    start = len(store)
+    if start:
+        # The blocks in the store were validated when they were stored, the validator only needs its tip
+        tip = store.tip()
+        validator.tip_height = start - 1
+        validator.tip_hash = Block.hash_block(tip)
+        validator.tip_next_target = next_target(tip, block_interval)
+        validator.tip_confirm_time = tip.confirm_time
+
+    with open(path, "rb") as file:
+        blocks = read_blocks(file, format, skip=start)
+        while True:
+            batch: list[Block] = []
+            read_error: Optional[ValueError] = None
+            try:
+                for block in blocks:
+                    batch.append(block)
+                    if len(batch) == IMPORT_BATCH_SIZE:
+                        break
+            except ValueError as error:
+                read_error = error
+
+            if batch:
+                _store_batch(validator, store, batch)
+            if read_error is not None:
+                raise read_error
+            if len(batch) < IMPORT_BATCH_SIZE:
+                return len(store) - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a saved chain to a file, or import an exported file into a chain folder.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export the chain of a folder (see chain_store.py) to a file")
+    export.add_argument("directory", help="the folder of the chain")
+    export.add_argument("path", help="the file to write, JSON lines if it ends with .jsonl, otherwise binary")
+    export.add_argument("--resume", action="store_true", help="continue an interrupted export instead of writing the file again")
+    load = commands.add_parser("import", help="validate an exported file and append it to the chain of a folder")
+    load.add_argument("path", help="the file to read, JSON lines if it ends with .jsonl, otherwise binary")
+    load.add_argument("directory", help="the folder of the chain, an interrupted import is continued")
+    load.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes validating the blocks")
+    load.add_argument("--block-interval", type=float, help="the BLOCK_INTERVAL the chain was mined with")
+    load.add_argument("--difficulty-bits", type=int, help="the difficulty (in bits) of the genesis block, if the chain was not mined with the DIFFICULTY of question_4.py")
+    load.add_argument("--require-signatures", action="store_true", help="every block must be signed")
+    arguments = parser.parse_args()
+
+    start = perf_counter()
+    if arguments.command == "export":
+        with ChainStore(arguments.directory) as store:
+            count = export_chain(store, arguments.path, resume=arguments.resume)
+    else:
+        # The store is not synced after every block, an import that is interrupted is continued from the last complete block
+        with ChainStore(arguments.directory, sync=False) as store:
+            try:
+                count = import_chain(
+                    arguments.path, store, workers=arguments.workers, block_interval=arguments.block_interval, require_signatures=arguments.require_signatures,
+                    genesis_target=None if arguments.difficulty_bits is None else target_from_bits(arguments.difficulty_bits),
+                )
+            except InvalidBlockError as error:
+                print(f"{ error }, the chain was imported up to height { len(store) - 1 }")
+                raise SystemExit(1)
+    elapsed = perf_counter() - start
+    print(f"{ arguments.command.capitalize() }ed { count:,} blocks in { elapsed:.2f} seconds ({ count / elapsed if elapsed > 0 else 0:,.0f} blocks/second)")
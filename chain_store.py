@@ -0,0 +1,223 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is a small storage engine for the blockchain of question_4.py, so the chain is not lost when the program exits.
+# The blocks are appended to segment files (segment_00000.dat, segment_00001.dat, ...) as records:
+#   length (4 bytes) | CRC32 of the block (4 bytes) | the block (Block.to_bytes)
+# and the index file (index.dat) has one fixed-width entry per block: segment number, offset and length of the record.
+# The index is read through mmap, so reading the block at any height is O(1) and the chain is never loaded into RAM.
+# A block only counts as stored once its index entry is written, so after a crash the unfinished tail is cut off on reopen.
+
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional
+from zlib import crc32
+import mmap
+import os
+import struct
+
+from question_4 import Block
+
+
+SEGMENT_SIZE: int = 64 * 1024 * 1024 # A new segment file is started when the current one gets bigger than this
+INDEX_FILE_NAME: str = "index.dat"
+INDEX_ENTRY_STRUCT = struct.Struct(">IQI") # Segment number, offset of the record, length of the record
+RECORD_HEADER_STRUCT = struct.Struct(">II") # Length of the block, CRC32 of the block
+
+
+def _segment_file_name(segment: int) -> str:
+    """This function returns the file name of a segment."""
+    return f"segment_{ segment:05d}.dat"
+
+
+class ChainStore:
+    """This class stores the blocks of a chain on disk and reads them back by height."""
+    directory: str
+    sync: bool # Call fsync after every append, slower but nothing is lost if the machine crashes
+
+
+    def __init__(self, directory: str, sync: bool = True) -> None:
+        self.directory = directory
+        self.sync = sync
+        os.makedirs(directory, exist_ok=True)
+
+        self._index_file = open(os.path.join(directory, INDEX_FILE_NAME), "a+b")
+        self._index_map: Optional[mmap.mmap] = None
+        self._length = 0 # Number of blocks in the index
+        self._segment_files: dict[int, BinaryIO] = {} # Segment number -> file for reading
+        self._read_lock = Lock() # Held while a segment file is seeked and read, so two threads do not move the position at once
+        self._recover()
+
+        # The segment the next block is appended to
+        last_segment, _, _ = self._entry(len(self) - 1) if len(self) else (0, 0, 0)
+        self._write_segment = last_segment
+        self._write_file = open(self._segment_path(last_segment), "ab")
+
+
+    def __enter__(self) -> "ChainStore":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """This method closes all the files of the store."""
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        for file in self._segment_files.values():
+            file.close()
+        self._segment_files.clear()
+        self._write_file.close()
+        self._index_file.close()
+
+
+    def _segment_path(self, segment: int) -> str:
+        """This method returns the path of a segment file."""
+        return os.path.join(self.directory, _segment_file_name(segment))
+
+
+    def _recover(self) -> None:
+        """
+        This method makes the files consistent again after a crash. It drops a half-written index entry,
+        the index entries whose record is not complete on disk, and the records that were written without an index entry.
+        """
+        index_size = os.path.getsize(self._index_file.name)
+        entries = index_size // INDEX_ENTRY_STRUCT.size
+        self._truncate_index(entries)
+
+        # Walk back from the end until the last indexed record is complete and not corrupted
+        while entries and self._read_record(entries - 1) is None:
+            entries -= 1
+        self._truncate_index(entries)
+        self._length = entries
+
+        # Cut the segment files after the last indexed record
+        last_segment, offset, length = self._entry(entries - 1) if entries else (0, 0, 0)
+        end = offset + length
+        if os.path.exists(self._segment_path(last_segment)):
+            os.truncate(self._segment_path(last_segment), end)
+        segment = last_segment + 1
+        while os.path.exists(self._segment_path(segment)):
+            if segment in self._segment_files:
+                self._segment_files.pop(segment).close()
+            os.remove(self._segment_path(segment))
+            segment += 1
+
+
+    def _truncate_index(self, entries: int) -> None:
+        """
+        This method cuts the index file after a number of entries and maps it again.
+        The map is closed first, because Windows cannot truncate a file that is mapped.
+        """
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        self._index_file.truncate(entries * INDEX_ENTRY_STRUCT.size)
+        self._remap()
+
+
+    def _remap(self) -> None:
+        """This method maps the index file again, it is needed after the file grew."""
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        self._index_file.flush()
+        if os.path.getsize(self._index_file.name) > 0:
+            self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def __len__(self) -> int:
+        """The number of stored blocks, which is also the height of the next block."""
+        return self._length
+
+
+    def _entry(self, height: int) -> tuple[int, int, int]:
+        """This method reads the index entry of a height: segment number, offset and length of the record."""
+        position = height * INDEX_ENTRY_STRUCT.size
+        # The index is only mapped again when an entry appended after the last mapping is read
+        if self._index_map is None or position + INDEX_ENTRY_STRUCT.size > len(self._index_map):
+            self._remap()
+        return INDEX_ENTRY_STRUCT.unpack_from(self._index_map, position)
+
+
+    def _read_record(self, height: int) -> Optional[bytes]:
+        """This method reads the serialized block at a height, or None if the record is incomplete or corrupted."""
+        segment, offset, length = self._entry(height)
+        # os.pread does not exist on Windows, so the file is seeked and read under a lock instead
+        with self._read_lock:
+            if segment not in self._segment_files:
+                if not os.path.exists(self._segment_path(segment)):
+                    return None
+                self._segment_files[segment] = open(self._segment_path(segment), "rb")
+            file = self._segment_files[segment]
+            file.seek(offset)
+            record = file.read(length)
+        if len(record) != length or length < RECORD_HEADER_STRUCT.size:
+            return None
+        block_length, checksum = RECORD_HEADER_STRUCT.unpack_from(record)
+        raw = record[RECORD_HEADER_STRUCT.size:]
+        if block_length != len(raw) or crc32(raw) != checksum:
+            return None
+        return raw
+
+
+    def append(self, block: Block) -> int:
+        """This method appends a block to the end of the chain and returns its height."""
+        raw = block.to_bytes()
+        record = RECORD_HEADER_STRUCT.pack(len(raw), crc32(raw)) + raw
+
+        # Start a new segment when the current one is full
+        offset = self._write_file.tell()
+        if offset > 0 and offset + len(record) > SEGMENT_SIZE:
+            self._write_file.close()
+            self._write_segment += 1
+            self._write_file = open(self._segment_path(self._write_segment), "ab")
+            offset = 0
+
+        # Write the record first, the index entry is written last so the block only counts once it is complete
+        self._write_file.write(record)
+        self._write_file.flush()
+        if self.sync:
+            os.fsync(self._write_file.fileno())
+
+        self._index_file.write(INDEX_ENTRY_STRUCT.pack(self._write_segment, offset, len(record)))
+        self._index_file.flush()
+        if self.sync:
+            os.fsync(self._index_file.fileno())
+
+        self._length += 1
+        return self._length - 1
+
+
+    def get(self, height: int) -> Block:
+        """This method reads the block at a height, negative heights count from the tip like a list."""
+        if height < 0:
+            height += len(self)
+        if not 0 <= height < len(self):
+            raise IndexError(f"There is no block at height { height }")
+
+        raw = self._read_record(height)
+        if raw is None:
+            raise ValueError(f"The block at height { height } is corrupted")
+        return Block.from_bytes(raw)
+
+
+    def __getitem__(self, height: int) -> Block:
+        return self.get(height)
+
+
+    def __iter__(self) -> Iterator[Block]:
+        return self.iter_from(0)
+
+
+    def iter_from(self, height: int) -> Iterator[Block]:
+        """This method streams the blocks from a height to the tip, one block at a time."""
+        for current in range(height, len(self)):
+            yield self.get(current)
+
+
+    def tip(self) -> Optional[Block]:
+        """This method returns the last block of the chain, or None if the chain is empty."""
+        return self.get(-1) if len(self) else None
@@ -0,0 +1,227 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This program checks that a blockchain of question_4.py is valid:
+# - every block hash is not above the target of the block,
+# - every target is the one the retargeting gives after the block before it (and the genesis block uses the initial target),
+# - every block counter matches its height,
+# - every previous hash is the hash of the block before it (and the genesis block uses the genesis previous hash),
+# - every block is confirmed after it was created and not in the future, and created after the block before it was confirmed,
+#   so the mining times used by the retargeting cannot add up to more than the real time.
+# The chain is split into chunks that are checked by worker processes. Every worker only checks the links inside its chunk
+# and returns the previous hash and target of its first block, and the hash and next target of its last block,
+# so the links between the chunks are checked afterwards without hashing anything again. Every block is hashed exactly once.
+# The signature of every signed block, and that its producer key is the one of the header, are checked in the same workers, so the signatures (which cost much more than the hashes)
+# are verified in parallel too. Every worker process keeps a KeyRegistry, so the key of a producer is only parsed once per process.
+
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from time import time as unix_time
+from typing import Iterable, Optional
+import os
+
+from cryptography.exceptions import UnsupportedAlgorithm
+
+from key_registry import KeyRegistry, fingerprint_digest
+from question_4 import Block, GENESIS_PREVIOUS_HASH, NO_PRODUCER, initial_target, next_target
+
+
+CHUNK_SIZE: int = 2048 # Number of blocks checked by one task of a worker process
+MAX_FUTURE_DRIFT: float = 2 * 60 * 60 # Seconds a confirm time may be ahead of the clock of the validator
+
+
+class InvalidBlockError(ValueError):
+    """This error is raised when a block of the chain is not valid."""
+    height: int
+    reason: str
+
+
+    def __init__(self, height: int, reason: str) -> None:
+        super().__init__(f"Block at height { height } is invalid: { reason }")
+        self.height = height
+        self.reason = reason
+
+
+ChunkResult = tuple[Optional[tuple[int, str]], int, str, str, int, int, float, float]
+
+# The public keys of the producers already seen by this process
+_key_registry = KeyRegistry()
+
+
+def _check_signature(block: Block, header: bytes, require_signatures: bool) -> Optional[str]:
+    """
+    This function returns why the signature of the block is not valid, or None if it is valid (or not required).
+    The producer key must be the one whose fingerprint is in the header, so the key and the signature cannot be replaced.
+    """
+    if not block.signature:
+        if block.producer_fingerprint != NO_PRODUCER:
+            return "the block is not signed by its producer"
+        return "the block is not signed" if require_signatures else None
+    try:
+        if fingerprint_digest(block.producer_key) != block.producer_fingerprint:
+            return "the producer key does not match the header"
+        valid = _key_registry.verify(_key_registry.add(block.producer_key), header, block.signature)
+    except (ValueError, IndexError, UnsupportedAlgorithm):
+        return "the producer key is not valid"
+    return None if valid else "the signature is not valid"
+
+
+def _validate_chunk(raw_blocks: list[bytes], start_height: int, block_interval: Optional[float], require_signatures: bool = False) -> ChunkResult:
+    """
+    This function checks the blocks of one chunk inside a worker process.
+    It returns the first problem (height and reason, or None), the height of the last block, the previous hash
+    of the first block, the hash of the last block, the target of the first block, the target expected
+    after the last block, the timestamp of the first block and the confirm time of the last block,
+    which are used to check the links between the chunks.
+    """
+    previous_block: Optional[Block] = None
+    previous_hash: Optional[str] = None
+    first_previous_hash = ""
+    first_target = 0
+    first_timestamp = 0.0
+    latest_confirm_time = unix_time() + MAX_FUTURE_DRIFT
+
+    def invalid(height: int, reason: str) -> ChunkResult:
+        return (height, reason), start_height, first_previous_hash, "", first_target, 0, first_timestamp, 0.0
+
+    for offset, raw in enumerate(raw_blocks):
+        height = start_height + offset
+        block = Block.from_bytes(raw)
+        header = block.header_bytes()
+        block_hash = sha256(header).hexdigest() # The only time this block is hashed (like Block.hash_block)
+
+        if offset == 0:
+            first_previous_hash = block.previous_hash
+            first_target = block.target
+            first_timestamp = block.timestamp
+        elif block.previous_hash != previous_hash:
+            return invalid(height, "the previous hash does not match the hash of the previous block")
+        elif block.target != next_target(previous_block, block_interval):
+            return invalid(height, "the target does not match the retargeting")
+        elif block.timestamp < previous_block.confirm_time:
+            return invalid(height, "the block was created before the previous block was confirmed")
+
+        if block.block_counter != height:
+            return invalid(height, f"the block counter is { block.block_counter }")
+        # The retargeting uses the mining time the block reports, so it must not be negative or in the future
+        if block.confirm_time < block.timestamp:
+            return invalid(height, "the block is confirmed before it was created")
+        if block.confirm_time > latest_confirm_time:
+            return invalid(height, "the confirm time is in the future")
+        if int(block_hash, 16) > block.target:
+            return invalid(height, "the hash is above the target")
+        # The signature is checked last, the other checks are much cheaper
+        problem = _check_signature(block, header, require_signatures)
+        if problem is not None:
+            return invalid(height, problem)
+        previous_block, previous_hash = block, block_hash
+
+    return (
+        None, start_height + len(raw_blocks) - 1, first_previous_hash, previous_hash or "", first_target,
+        next_target(previous_block, block_interval), first_timestamp, previous_block.confirm_time,
+    )
+
+
+def _chunks(blocks: Iterable[Block], start_height: int) -> Iterable[tuple[list[bytes], int]]:
+    """This function streams the blocks as chunks of serialized blocks with the height of their first block."""
+    chunk: list[bytes] = []
+    for block in blocks:
+        chunk.append(block.to_bytes())
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk, start_height
+            start_height += len(chunk)
+            chunk = []
+    if chunk:
+        yield chunk, start_height
+
+
+class ChainValidator:
+    """
+    This class validates a whole chain, then remembers its tip (height and hash),
+    so the blocks appended later can be validated without checking the whole chain again.
+    """
+    genesis_target: int # The target the genesis block must have
+    block_interval: Optional[float] # The block interval of the retargeting, see question_4.next_target
+    workers: int
+    require_signatures: bool # Every block must be signed, otherwise only the blocks that are signed are checked
+    tip_height: int # The height of the last validated block, -1 if nothing is validated yet
+    tip_hash: Optional[str] # The hash of the last validated block
+    tip_next_target: Optional[int] # The target the block after the last validated block must have
+    tip_confirm_time: Optional[float] # The block after the last validated block must not be created before this time
+
+
+    def __init__(self, genesis_target: Optional[int] = None, workers: int = os.cpu_count() or 1, block_interval: Optional[float] = None, require_signatures: bool = False) -> None:
+        self.genesis_target = initial_target() if genesis_target is None else genesis_target
+        self.block_interval = block_interval
+        self.workers = workers
+        self.require_signatures = require_signatures
+        self.tip_height = -1
+        self.tip_hash = None
+        self.tip_next_target = None
+        self.tip_confirm_time = None
+
+
+    def validate(self, blocks: Iterable[Block]) -> None:
+        """
+        This method validates a whole chain from the genesis block, e.g. a list of blocks or a ChainStore.
+        It raises an InvalidBlockError for the first invalid block, otherwise the tip is remembered.
+        """
+        self.tip_height = -1
+        self.tip_hash = None
+        self.tip_next_target = None
+        self.tip_confirm_time = None
+        self._validate_from(blocks, -1, GENESIS_PREVIOUS_HASH, self.genesis_target, float("-inf"))
+
+
+    def validate_appended(self, blocks: Iterable[Block]) -> None:
+        """
+        This method validates only the blocks appended after the last validated tip,
+        e.g. store.iter_from(validator.tip_height + 1) for a ChainStore. It raises an InvalidBlockError for the first invalid block, otherwise the tip moves to the last block.
+        """
+        if self.tip_hash is None:
+            raise ValueError("Validate the whole chain before validating the appended blocks")
+        self._validate_from(blocks, self.tip_height, self.tip_hash, self.tip_next_target, self.tip_confirm_time)
+
+
+    def _validate_from(self, blocks: Iterable[Block], tip_height: int, tip_hash: str, tip_next_target: int, tip_confirm_time: float) -> None:
+        """This method validates the blocks that come after the given tip, chunk by chunk."""
+        chunks = _chunks(blocks, tip_height + 1)
+
+        if self.workers <= 1:
+            results = (_validate_chunk(chunk, start_height, self.block_interval, self.require_signatures) for chunk, start_height in chunks)
+            self._check_results(results, tip_height, tip_hash, tip_next_target, tip_confirm_time)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Keep only a few chunks in flight, so a long chain is never loaded into memory at once
+            pending = []
+            def results():
+                for chunk, start_height in chunks:
+                    pending.append(executor.submit(_validate_chunk, chunk, start_height, self.block_interval, self.require_signatures))
+                    if len(pending) >= 2 * self.workers:
+                        yield pending.pop(0).result()
+                while pending:
+                    yield pending.pop(0).result()
+
+            try:
+                self._check_results(results(), tip_height, tip_hash, tip_next_target, tip_confirm_time)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+    def _check_results(self, results: Iterable[ChunkResult], tip_height: int, tip_hash: str, tip_next_target: int, tip_confirm_time: float) -> None:
+        """This method checks the results of the chunks in order, including the links between the chunks."""
+        for problem, last_height, first_previous_hash, last_hash, first_target, last_next_target, first_timestamp, last_confirm_time in results:
+            if first_previous_hash != tip_hash:
+                raise InvalidBlockError(tip_height + 1, "the previous hash does not match the hash of the previous block")
+            if first_target != tip_next_target:
+                raise InvalidBlockError(tip_height + 1, "the target does not match the retargeting")
+            if first_timestamp < tip_confirm_time:
+                raise InvalidBlockError(tip_height + 1, "the block was created before the previous block was confirmed")
+            if problem is not None:
+                raise InvalidBlockError(*problem)
+
+            # The whole chunk is valid, so the tip moves to its last block
+            tip_height, tip_hash, tip_next_target, tip_confirm_time = last_height, last_hash, last_next_target, last_confirm_time
+            self.tip_height, self.tip_hash, self.tip_next_target, self.tip_confirm_time = tip_height, tip_hash, tip_next_target, tip_confirm_time
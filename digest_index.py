@@ -0,0 +1,223 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: For short strings, the sequence of question_1.py is small enough to hash every candidate once.
+# This program saves the SHA-256 of every candidate up to a length in a file of fixed-width records
+#   SHA-256 digest (32 bytes) | index of the candidate (8 bytes)
+# sorted by digest, so a hash is found with a binary search on the mmap'd file instead of running the brute force again.
+# The file is built in two parallel passes that never hold the whole keyspace in memory:
+# 1. the workers hash contiguous index ranges and append every record to a bucket file chosen by the first bits of the digest,
+# 2. every bucket is sorted on its own, and the sorted buckets are joined in order of their bits.
+# Example:
+#   python3 digest_index.py build index.bin --max-length 4 --workers 4
+#   python3 digest_index.py lookup index.bin 961b6dd3ede3cb8ecbaacbd68de040cd78eb2ed5889130cceb4c49268ea4d506
+
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from time import perf_counter
+from typing import Optional
+import argparse
+import bisect
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from hash_cracker import CandidateEnumerator, candidate_to_index, index_to_candidate
+
+
+MAGIC: bytes = b"SHA256IX"
+FILE_HEADER_STRUCT = struct.Struct(">8sIQ") # Magic, maximum candidate length, number of records
+RECORD_STRUCT = struct.Struct(">32sQ") # Digest, index of the candidate
+MAX_BUCKET_SIZE: int = 64 * 1024 * 1024 # A bucket is sorted in memory, so it should not be bigger than this (in bytes)
+MAX_BUCKET_BITS: int = 12 # At most 4096 buckets, so the workers do not open too many files
+WRITE_BUFFER_SIZE: int = 16 * 1024 * 1024 # The records a worker keeps in memory (over all its buckets) before writing them
+
+
+def keyspace_size(max_length: int) -> int:
+    """This function returns the number of candidates from length 1 to the maximum length."""
+    return candidate_to_index("a" * (max_length + 1))
+
+
+def _bucket_bits(records: int) -> int:
+    """This function returns how many leading bits of the digest choose the bucket, so every bucket fits in MAX_BUCKET_SIZE."""
+    bits = 0
+    while bits < MAX_BUCKET_BITS and records * RECORD_STRUCT.size > MAX_BUCKET_SIZE << bits:
+        bits += 1
+    return bits
+
+
+def _bucket_path(directory: str, bucket: int, part: Optional[int] = None) -> str:
+    """This function returns the path of a bucket file, or of the part of a bucket written by one worker task."""
+    return os.path.join(directory, f"bucket_{ bucket:04d}.dat" if part is None else f"bucket_{ bucket:04d}_{ part:04d}.part")
+
+
+def _hash_range(start: int, stop: int, bits: int, directory: str, part: int) -> int:
+    """
+    This function hashes the candidates from start to stop (exclusive) inside a worker process and appends the records
+    to the part files of their buckets. The buffers are written out whenever they get bigger than WRITE_BUFFER_SIZE.
+    It returns the number of records written.
+    """
+    buffers: dict[int, bytearray] = {}
+    buffered = 0
+    shift = 32 - bits
+    pack = RECORD_STRUCT.pack
+
+    def flush() -> None:
+        for bucket, buffer in buffers.items():
+            with open(_bucket_path(directory, bucket, part), "ab") as file:
+                file.write(buffer)
+        buffers.clear()
+
+    for index, candidate in zip(range(start, stop), CandidateEnumerator(start, stop)):
+        digest = sha256(candidate).digest()
+        bucket = int.from_bytes(digest[:4], "big") >> shift if bits else 0
+        buffer = buffers.get(bucket)
+        if buffer is None:
+            buffer = buffers[bucket] = bytearray()
+        buffer += pack(digest, index)
+        buffered += RECORD_STRUCT.size
+        if buffered >= WRITE_BUFFER_SIZE:
+            flush()
+            buffered = 0
+    flush()
+    return stop - start
+
+
+def _sort_bucket(directory: str, bucket: int, parts: int) -> int:
+    """This function sorts the records of one bucket inside a worker process and writes them to the bucket file."""
+    data = bytearray()
+    for part in range(parts):
+        path = _bucket_path(directory, bucket, part)
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                data += file.read()
+            os.remove(path)
+
+    size = RECORD_STRUCT.size
+    records = sorted(bytes(data[offset:offset + size]) for offset in range(0, len(data), size))
+    with open(_bucket_path(directory, bucket), "wb") as file:
+        file.write(b"".join(records))
+    return len(records)
+
+
+def build_index(path: str, max_length: int, workers: int = os.cpu_count() or 1) -> int:
+    """
+    This function builds the index file of every candidate from length 1 to the maximum length and returns the number of records.
+    The temporary buckets are written next to the index file.
+    """
+    records = keyspace_size(max_length)
+    bits = _bucket_bits(records)
+    tasks = workers * 4 # A few ranges per worker, so a slow worker does not keep the others waiting
+    range_size = -(-records // tasks)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as directory:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # 1. Hash the candidates into the buckets
+            futures = [
+                executor.submit(_hash_range, start, min(start + range_size, records), bits, directory, part)
+                for part, start in enumerate(range(0, records, range_size))
+            ]
+            for future in futures:
+                future.result()
+
+            # 2. Sort every bucket
+            futures = [executor.submit(_sort_bucket, directory, bucket, len(futures)) for bucket in range(1 << bits)]
+            if sum(future.result() for future in futures) != records:
+                raise RuntimeError("Some records were lost while building the index")
+
+        # Join the sorted buckets in order, the first bits of the digests grow from one bucket to the next
+        temporary_path = f"{ path }.tmp"
+        with open(temporary_path, "wb") as output:
+            output.write(FILE_HEADER_STRUCT.pack(MAGIC, max_length, records))
+            for bucket in range(1 << bits):
+                with open(_bucket_path(directory, bucket), "rb") as file:
+                    shutil.copyfileobj(file, output)
+        os.replace(temporary_path, path)
+    return records
+
+
+class _Digests:
+    """This class shows the digests of the mmap'd records as a read-only sequence, so bisect can search them."""
+
+    def __init__(self, data: mmap.mmap, count: int) -> None:
+        self._data = data
+        self._count = count
+
+
+    def __len__(self) -> int:
+        return self._count
+
+
+    def __getitem__(self, position: int) -> bytes:
+        offset = FILE_HEADER_STRUCT.size + position * RECORD_STRUCT.size
+        return self._data[offset:offset + 32]
+
+
+class DigestIndex:
+    """This class looks up digests in an index file built by build_index."""
+    path: str
+    max_length: int # The candidates of the index are from length 1 to this length
+    count: int # The number of records
+
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_length, self.count = FILE_HEADER_STRUCT.unpack_from(self._data)
+        if magic != MAGIC or len(self._data) != FILE_HEADER_STRUCT.size + self.count * RECORD_STRUCT.size:
+            self.close()
+            raise ValueError(f"{ path } is not a complete digest index")
+        self._digests = _Digests(self._data, self.count)
+
+
+    def __enter__(self) -> "DigestIndex":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """This method closes the index file."""
+        self._data.close()
+        self._file.close()
+
+
+    def lookup(self, digest: bytes) -> Optional[str]:
+        """This method returns the candidate whose SHA-256 is the digest, or None if it is not in the index, with a binary search."""
+        position = bisect.bisect_left(self._digests, digest)
+        if position == self.count or self._digests[position] != digest:
+            return None
+        _, index = RECORD_STRUCT.unpack_from(self._data, FILE_HEADER_STRUCT.size + position * RECORD_STRUCT.size)
+        return index_to_candidate(index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or search a sorted file of the SHA-256 of every candidate of question 1.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="hash every candidate up to a length into an index file")
+    build.add_argument("path", help="the index file to write")
+    build.add_argument("--max-length", type=int, default=3, help="the longest candidates to include")
+    build.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    lookup = commands.add_parser("lookup", help="find the candidate of SHA-256 hashes in an index file")
+    lookup.add_argument("path", help="the index file to read")
+    lookup.add_argument("hashes", nargs="+", help="the SHA-256 hashes in hexadecimal")
+    arguments = parser.parse_args()
+
+    if arguments.command == "build":
+        start = perf_counter()
+        records = build_index(arguments.path, arguments.max_length, arguments.workers)
+        elapsed = perf_counter() - start
+        print(f"Saved { records:,} records to { arguments.path } in { elapsed:.2f} seconds ({ records / elapsed:,.0f} records/second)")
+    else:
+        with DigestIndex(arguments.path) as index:
+            for hash_hex in arguments.hashes:
+                start = perf_counter()
+                candidate = index.lookup(bytes.fromhex(hash_hex))
+                elapsed = (perf_counter() - start) * 1_000_000
+                result = "not found" if candidate is None else repr(candidate)
+                print(f"{ hash_hex }: { result } ({ elapsed:.1f} microseconds)")
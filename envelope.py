@@ -0,0 +1,162 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: RSA-OAEP (encrypt_message of question_3.py) can only encrypt about 190 bytes with a 2048-bit key.
+# This is envelope encryption: a random AES-256 key encrypts the data with AES-GCM, and only that key is encrypted with RSA-OAEP.
+# The data is read, encrypted and written in chunks of CHUNK_SIZE bytes, so a file of any size is encrypted with constant memory.
+# The encrypted file is
+#   header: MAGIC | chunk size (4 bytes) | length of the wrapped key (2 bytes) | wrapped key | nonce prefix (7 bytes)
+#   chunks: AES-GCM of every chunk (its size + 16 bytes of tag)
+# The nonce of a chunk is the nonce prefix, the number of the chunk (4 bytes) and 1 byte that is 1 for the last chunk only,
+# and the header is authenticated with every chunk, so chunks cannot be changed, reordered, removed or cut off at the end.
+# Example:
+#   python3 envelope.py encrypt --public-key alice.pub big.iso big.iso.enc
+#   python3 envelope.py decrypt --private-key alice.pem big.iso.enc big.iso
+
+from time import perf_counter
+from typing import BinaryIO, Iterator, Optional
+import argparse
+import getpass
+import os
+import struct
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from question_3 import decrypt_message, encrypt_message
+
+
+MAGIC: bytes = b"RSAGCM1\n"
+HEADER_STRUCT = struct.Struct(">8sIH") # Magic, chunk size, length of the wrapped key
+NONCE_PREFIX_SIZE: int = 7
+CHUNK_NUMBER_STRUCT = struct.Struct(">IB") # Number of the chunk, 1 for the last chunk
+TAG_SIZE: int = 16
+CHUNK_SIZE: int = 1024 * 1024 # Bytes of data in a chunk
+MAX_CHUNK_SIZE: int = 64 * 1024 * 1024 # Biggest chunk size accepted, a chunk is held in memory twice while it is encrypted or decrypted
+MAX_CHUNKS: int = 2 ** 32 # The number of the chunk has 4 bytes
+
+
+def _nonce(prefix: bytes, number: int, last: bool) -> bytes:
+    """This function returns the 12-byte nonce of a chunk."""
+    if number >= MAX_CHUNKS:
+        raise ValueError("The stream has too many chunks, use a bigger chunk size")
+    return prefix + CHUNK_NUMBER_STRUCT.pack(number, last)
+
+
+def _check_chunk_size(chunk_size: int) -> None:
+    """This function raises ValueError if the chunk size cannot be used (a chunk of 0 bytes would never read the data)."""
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"The chunk size must be between 1 and { MAX_CHUNK_SIZE } bytes, not { chunk_size }")
+
+
+def _read_chunks(source: BinaryIO, size: int) -> Iterator[tuple[bytes, bool]]:
+    """
+    This function yields the chunks of the stream with True for the last one. It reads one chunk ahead to know which chunk is
+    the last, and an empty stream is one empty last chunk.
+    """
+    chunk = source.read(size)
+    while True:
+        following = source.read(size)
+        yield chunk, not following
+        if not following:
+            return
+        chunk = following
+
+
+def encrypt_stream(public_key: rsa.RSAPublicKey, source: BinaryIO, destination: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    This function encrypts the source stream into the destination stream and returns the number of bytes encrypted.
+    It raises ValueError if the chunk size is not between 1 and MAX_CHUNK_SIZE.
+    """
+    _check_chunk_size(chunk_size)
+    data_key = AESGCM.generate_key(bit_length=256)
+    wrapped_key = encrypt_message(public_key, data_key)
+    nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+    header = HEADER_STRUCT.pack(MAGIC, chunk_size, len(wrapped_key)) + wrapped_key + nonce_prefix
+    destination.write(header)
+
+    cipher = AESGCM(data_key)
+    total = 0
+    for number, (chunk, last) in enumerate(_read_chunks(source, chunk_size)):
+        destination.write(cipher.encrypt(_nonce(nonce_prefix, number, last), chunk, header))
+        total += len(chunk)
+    return total
+
+
+def decrypt_stream(private_key: rsa.RSAPrivateKey, source: BinaryIO, destination: BinaryIO) -> int:
+    """
+    This function decrypts a stream encrypted by encrypt_stream and returns the number of bytes decrypted.
+    It raises cryptography.exceptions.InvalidTag if the stream was changed or cut off, and ValueError if its header is not valid.
+    A chunk is only written after it is authenticated, but the chunks before a bad chunk are already written.
+    """
+    fixed = source.read(HEADER_STRUCT.size)
+    if len(fixed) != HEADER_STRUCT.size:
+        raise ValueError("The stream is too short to be encrypted by encrypt_stream")
+    magic, chunk_size, wrapped_key_size = HEADER_STRUCT.unpack(fixed)
+    if magic != MAGIC:
+        raise ValueError("The stream was not encrypted by encrypt_stream")
+    _check_chunk_size(chunk_size)
+    wrapped_key = source.read(wrapped_key_size)
+    nonce_prefix = source.read(NONCE_PREFIX_SIZE)
+    if len(wrapped_key) != wrapped_key_size or len(nonce_prefix) != NONCE_PREFIX_SIZE:
+        raise ValueError("The header of the stream is not complete")
+    header = fixed + wrapped_key + nonce_prefix
+
+    cipher = AESGCM(decrypt_message(private_key, wrapped_key))
+    total = 0
+    for number, (chunk, last) in enumerate(_read_chunks(source, chunk_size + TAG_SIZE)):
+        plaintext = cipher.decrypt(_nonce(nonce_prefix, number, last), chunk, header)
+        destination.write(plaintext)
+        total += len(plaintext)
+    return total
+
+
+def encrypt_file(public_key: rsa.RSAPublicKey, input_path: str, output_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """This function encrypts a file into another file and returns the number of bytes encrypted."""
+    with open(input_path, "rb") as source, open(output_path, "wb") as destination:
+        return encrypt_stream(public_key, source, destination, chunk_size)
+
+
+def decrypt_file(private_key: rsa.RSAPrivateKey, input_path: str, output_path: str) -> int:
+    """
+    This function decrypts a file into another file and returns the number of bytes decrypted.
+    The data is written to a temporary file that is only renamed when the whole file is authenticated.
+    """
+    temporary_path = f"{ output_path }.tmp"
+    try:
+        with open(input_path, "rb") as source, open(temporary_path, "wb") as destination:
+            total = decrypt_stream(private_key, source, destination)
+        os.replace(temporary_path, output_path)
+        return total
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt files of any size with AES-GCM and an RSA-OAEP wrapped key.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    encrypt = commands.add_parser("encrypt", help="encrypt a file for the owner of a public key")
+    encrypt.add_argument("--public-key", required=True, help="the public key in OpenSSH or PEM format")
+    encrypt.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes of data per chunk")
+    decrypt = commands.add_parser("decrypt", help="decrypt a file with a private key")
+    decrypt.add_argument("--private-key", required=True, help="the private key in PEM format, its password is asked if it is encrypted")
+    for command in (encrypt, decrypt):
+        command.add_argument("input", help="the file to read")
+        command.add_argument("output", help="the file to write")
+    arguments = parser.parse_args()
+
+    start = perf_counter()
+    if arguments.command == "encrypt":
+        with open(arguments.public_key, "rb") as file:
+            data = file.read()
+        key = serialization.load_ssh_public_key(data) if data.startswith(b"ssh-") else serialization.load_pem_public_key(data)
+        total = encrypt_file(key, arguments.input, arguments.output, arguments.chunk_size)
+    else:
+        with open(arguments.private_key, "rb") as file:
+            data = file.read()
+        password: Optional[bytes] = getpass.getpass("Password of the private key: ").encode() if b"ENCRYPTED" in data else None
+        total = decrypt_file(serialization.load_pem_private_key(data, password=password), arguments.input, arguments.output)
+    elapsed = perf_counter() - start
+    print(f"{ arguments.command.capitalize() }ed { total:,} bytes in { elapsed:.2f} seconds ({ total / 1024 / 1024 / elapsed:,.1f} MB/second)")
@@ -0,0 +1,291 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is a multi-core version of the brute force of question_1.py (Task 2).
+# Every candidate string has an index: 0 is "a", 1 is "b", ..., 84 is "@", 85 is "aa" and so on,
+# in exactly the same order as create_sequence_string. Because a candidate is computed from its index,
+# the index space is split into contiguous ranges that are searched by different processes at the same time,
+# and a stopped search can be resumed from the index it reports (or from its checkpoint file). Example:
+#   python3 hash_cracker.py 961b6dd3ede3cb8ecbaacbd68de040cd78eb2ed5889130cceb4c49268ea4d506 --workers 4 --checkpoint search.json
+
+from hashlib import sha256
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Optional
+import argparse
+import json
+import os
+
+from question_1 import SEQUENCE
+from search_pool import Task, run_search
+
+
+ALPHABET: str = SEQUENCE # The symbols in the order of create_sequence_string
+BASE: int = len(ALPHABET) # 85 symbols
+_SYMBOL_VALUES: dict[str, int] = {symbol: value for value, symbol in enumerate(ALPHABET)}
+
+# The byte of the symbol after every symbol (indexed by the byte of the symbol), so the next candidate needs no search
+_FIRST_SYMBOL: int = ord(ALPHABET[0])
+_LAST_SYMBOL: int = ord(ALPHABET[-1])
+_NEXT_SYMBOL: bytes = bytes(
+    ord(ALPHABET[_SYMBOL_VALUES[chr(byte)] + 1]) if chr(byte) in _SYMBOL_VALUES and byte != _LAST_SYMBOL else 0
+    for byte in range(256)
+)
+
+RANGE_SIZE: int = 200_000 # Number of candidates a worker process searches before it is given the next range
+STOP_CHECK_INTERVAL: int = 4096 # How often (in candidates) a worker process checks if another worker already found the match
+
+
+def index_to_candidate(index: int) -> str:
+    """
+    This function returns the candidate string at an index. The candidates are numbers in bijective base 85
+    (there is no zero symbol), so every length follows the one before it without a gap: "@" is followed by "aa".
+    """
+    if index < 0:
+        raise ValueError("The index must not be negative")
+    symbols = []
+    number = index + 1
+    while number > 0:
+        number, value = divmod(number - 1, BASE)
+        symbols.append(ALPHABET[value])
+    return "".join(reversed(symbols))
+
+
+def candidate_to_index(candidate: str) -> int:
+    """This function returns the index of a candidate string, the inverse of index_to_candidate."""
+    if not candidate:
+        raise ValueError("The candidate must not be empty")
+    number = 0
+    for symbol in candidate:
+        if symbol not in _SYMBOL_VALUES:
+            raise ValueError(f"The symbol { symbol!r} is not in the alphabet")
+        number = number * BASE + _SYMBOL_VALUES[symbol] + 1
+    return number - 1
+
+
+class CandidateEnumerator:
+    """
+    This class streams the candidates from the start index to the stop index (exclusive, None for no end) in the order of
+    create_sequence_string. It always yields the same bytearray, changed in place, so nothing is allocated per candidate:
+    copy it (bytes(candidate)) to keep it. The index is the index of the candidate that was yielded last,
+    so a search that is paused can be resumed from a checkpoint without skipping anything.
+    """
+    index: int # The index of the current candidate
+    stop: Optional[int]
+
+
+    def __init__(self, start: int = 0, stop: Optional[int] = None) -> None:
+        self.index = start
+        self.stop = stop
+
+
+    def __iter__(self) -> Iterator[bytearray]:
+        candidate = bytearray(index_to_candidate(self.index).encode())
+        next_symbol = _NEXT_SYMBOL
+        while self.stop is None or self.index < self.stop:
+            yield candidate
+
+            # Most of the time only the last symbol changes
+            last = candidate[-1]
+            if last != _LAST_SYMBOL:
+                candidate[-1] = next_symbol[last]
+            else:
+                # Rollover the last symbols, e.g. "a@@" becomes "baa", or "@@" becomes "aaa"
+                position = len(candidate) - 1
+                while position >= 0 and candidate[position] == _LAST_SYMBOL:
+                    candidate[position] = _FIRST_SYMBOL
+                    position -= 1
+                if position >= 0:
+                    candidate[position] = next_symbol[candidate[position]]
+                else:
+                    candidate.insert(0, _FIRST_SYMBOL)
+            self.index += 1
+
+
+    def checkpoint(self) -> dict:
+        """This method returns the state of the enumerator, it can be saved as JSON."""
+        return {"index": self.index, "stop": self.stop}
+
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: dict) -> "CandidateEnumerator":
+        """This method creates an enumerator that continues from a checkpoint."""
+        return cls(checkpoint["index"], checkpoint["stop"])
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """This function saves a checkpoint as JSON. It writes a temporary file first, so a crash never leaves half a checkpoint."""
+    temporary_path = f"{ path }.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    """This function loads a checkpoint saved by save_checkpoint, or returns None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+class CrackResult:
+    """The result of a search: the matches, the number of candidates tested and where to resume."""
+    matches: list[tuple[int, str]] # The index and the candidate of every match, in the order they were found
+    attempts: int # Number of candidates hashed, by all the workers together
+    elapsed: float # Seconds
+    resume_index: int # Every index below this one was searched, so a new search can start from here
+
+
+    def __init__(self, matches: list[tuple[int, str]], attempts: int, elapsed: float, resume_index: int) -> None:
+        self.matches = matches
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.resume_index = resume_index
+
+
+    @property
+    def index(self) -> Optional[int]:
+        """The index of the first match, or None."""
+        return self.matches[0][0] if self.matches else None
+
+
+    @property
+    def candidate(self) -> Optional[str]:
+        """The candidate of the first match, or None."""
+        return self.matches[0][1] if self.matches else None
+
+
+    @property
+    def candidates_per_second(self) -> float:
+        """The average number of candidates per second of all the workers together."""
+        return self.attempts / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def load_targets(path: str) -> set[bytes]:
+    """
+    This function loads a file of SHA-256 hashes in hexadecimal, one per line, as a set of raw 32-byte digests.
+    The empty lines and the lines starting with # are skipped.
+    """
+    targets: set[bytes] = set()
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                digest = bytes.fromhex(line)
+            except ValueError:
+                digest = b""
+            if len(digest) != 32:
+                raise ValueError(f"Line { line_number } of { path } is not a SHA-256 hash")
+            targets.add(digest)
+    return targets
+
+
+def search_range(targets: frozenset[bytes], start: int, stop: int, stop_event = None) -> tuple[list[int], int]:
+    """
+    This function hashes the candidates from start to stop (exclusive) once each, and looks up every raw SHA-256 digest
+    in the set of targets, which costs the same for one target or thousands of them.
+    It returns the indexes of the matches and the number of candidates tested. It stops early once every target matched.
+    """
+    matches: list[int] = []
+    candidates = iter(CandidateEnumerator(start, stop))
+    for chunk_start in range(start, stop, STOP_CHECK_INTERVAL):
+        if stop_event is not None and stop_event.is_set():
+            return matches, chunk_start - start
+        # The range goes first in zip, so no candidate is taken from the next chunk
+        for index, candidate in zip(range(chunk_start, min(chunk_start + STOP_CHECK_INTERVAL, stop)), candidates):
+            if sha256(candidate).digest() in targets:
+                matches.append(index)
+                if len(matches) == len(targets):
+                    return matches, index - start + 1
+    return matches, stop - start
+
+
+def crack_many(targets: set[bytes], start: int = 0, stop: Optional[int] = None, workers: int = os.cpu_count() or 1, checkpoint_path: Optional[str] = None, on_match: Optional[Callable[[int, str], None]] = None, found: Iterable[tuple[int, str]] = ()) -> CrackResult:
+    """
+    This function searches the candidates from start to stop (exclusive, None for no end) for the ones whose SHA-256 is one of the targets.
+    The range is split into contiguous ranges of RANGE_SIZE candidates, and every idle worker gets the next range (see search_pool.py).
+    Every match is given to on_match (index and candidate) as soon as its range finishes.
+    Once every target matched, the other workers are stopped and the pending ranges are cancelled.
+    If it is interrupted (Ctrl+C), the search stops and the result tells where to resume.
+    If a checkpoint path is given, the index to resume from and the matches are saved there every time a range finishes.
+    The matches found before start (e.g. the matches of a checkpoint) are given as found, their targets are not searched again.
+    """
+    matches: list[tuple[int, str]] = [(index, candidate) for index, candidate in found]
+    remaining = set(targets) - {sha256(candidate.encode()).digest() for _, candidate in matches}
+    attempts = 0
+    next_start = start
+    begin = perf_counter()
+
+    def ranges() -> Iterator[Task]:
+        """This function yields the ranges to search, next_start is the start of the range that is not given out yet."""
+        nonlocal next_start
+        while stop is None or next_start < stop:
+            range_stop = next_start + RANGE_SIZE if stop is None else min(next_start + RANGE_SIZE, stop)
+            range_start, next_start = next_start, range_stop
+            yield {"start": range_start, "stop": range_stop}
+
+    def on_result(task: Task, result: tuple[list[int], int], running: list[Task]) -> bool:
+        """This function collects the matches of a finished range and saves the checkpoint, it returns False once every target matched."""
+        nonlocal attempts
+        indexes, tried = result
+        attempts += tried
+        for index in indexes:
+            candidate = index_to_candidate(index)
+            remaining.discard(sha256(candidate.encode()).digest())
+            matches.append((index, candidate))
+            if on_match is not None:
+                on_match(index, candidate)
+        if checkpoint_path is not None and remaining:
+            save_checkpoint(checkpoint_path, {"index": min((running_task["start"] for running_task in running), default=next_start), "stop": stop, "matches": matches})
+        return bool(remaining)
+
+    unfinished = run_search(search_range, ranges(), frozenset(remaining), workers, on_result) if remaining else []
+
+    # Every index before the earliest range that did not finish was searched
+    resume_index = min((task["start"] for task in unfinished), default=next_start)
+    return CrackResult(matches, attempts, perf_counter() - begin, resume_index)
+
+
+def crack(target: bytes, start: int = 0, stop: Optional[int] = None, workers: int = os.cpu_count() or 1, checkpoint_path: Optional[str] = None) -> CrackResult:
+    """This function searches for the candidate whose SHA-256 is the target, see crack_many."""
+    return crack_many({target}, start, stop, workers, checkpoint_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the strings of the question 1 sequence whose SHA-256 is the given hash (or one of the hashes of a file).")
+    parser.add_argument("hash", nargs="?", help="the SHA-256 hash in hexadecimal")
+    parser.add_argument("--targets", help="a file with one SHA-256 hash per line, all of them are searched at the same time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    parser.add_argument("--start", type=int, default=0, help="the index to start from, e.g. the resume index of a stopped search")
+    parser.add_argument("--stop", type=int, help="the index to stop at (exclusive), no end by default")
+    parser.add_argument("--checkpoint", help="a JSON file to save the progress to, the search continues from it if it exists")
+    arguments = parser.parse_args()
+    if (arguments.hash is None) == (arguments.targets is None):
+        parser.error("give either a hash or --targets")
+
+    targets = load_targets(arguments.targets) if arguments.targets else {bytes.fromhex(arguments.hash)}
+    start, stop = arguments.start, arguments.stop
+    checkpoint = load_checkpoint(arguments.checkpoint) if arguments.checkpoint else None
+    found: list[tuple[int, str]] = []
+    if checkpoint is not None:
+        start, stop = checkpoint["index"], checkpoint["stop"]
+        # The matches found before the checkpoint are kept, only the hashes that are still missing are searched
+        found = [(index, candidate) for index, candidate in checkpoint.get("matches", []) if sha256(candidate.encode()).digest() in targets]
+
+    def print_match(index: int, candidate: str) -> None:
+        print(f"Hash match found at index { index }: { candidate } ({ sha256(candidate.encode()).hexdigest() })", flush=True)
+
+    for index, candidate in found:
+        print_match(index, candidate)
+    print(f"Searching { len(targets) - len(found) } hashes from index { start } with { arguments.workers } workers, press Ctrl+C to stop...")
+    result = crack_many(targets, start, stop, arguments.workers, arguments.checkpoint, print_match, found)
+
+    if len(result.matches) == len(targets):
+        print("All the hashes were found")
+    else:
+        if arguments.checkpoint:
+            save_checkpoint(arguments.checkpoint, {"index": result.resume_index, "stop": stop, "matches": result.matches})
+        print(f"{ len(result.matches) }/{ len(targets) } hashes found, resume with --start { result.resume_index }")
+    print(f"{ result.attempts:,} candidates in { result.elapsed:.2f} seconds ({ result.candidates_per_second:,.0f} candidates/second)")
@@ -0,0 +1,286 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: Generating an RSA key (generate_key_pair of question_3.py) takes from tens to hundreds of milliseconds.
+# KeyPool keeps a few keys generated in advance by worker processes, so taking a new key only takes it out of a queue,
+# and a new key is generated in the background to replace it.
+# KeyStore saves the keys in a directory, one "<name>.<version>.pem" file (PKCS#8, encrypted with a password) and one
+# "<name>.<version>.pub" file (OpenSSH) per key, and "<name>.current" gives the current version, so a rotation switches both
+# files at once. The keys are only read (and decrypted) again when the version changed, and the public key is read
+# from its own file, so it never needs the password. Example:
+#   with KeyPool(size=4) as pool:
+#       store = KeyStore("keys", password=b"secret")
+#       store.rotate("alice", pool) # Replace the key of alice with a fresh one from the pool
+#       signature = sign_message(store.private_key("alice"), message)
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from queue import Empty, Queue
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Callable, Optional, Union
+import argparse
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from question_3 import KEY_SIZE, generate_key_pair, serialize_private_key
+
+
+POOL_SIZE: int = 4 # Number of keys kept ready in the pool
+PRIVATE_KEY_SUFFIX: str = ".pem"
+PUBLIC_KEY_SUFFIX: str = ".pub"
+CURRENT_SUFFIX: str = ".current" # The file with the current version of a key
+VERSION_SIZE: int = 8 # Random bytes of the version of a saved key
+
+
+def _generate_key_der(key_size: int) -> bytes:
+    """
+    This function generates a key inside a worker process. The key objects cannot be sent between processes,
+    so the key is sent as DER bytes.
+    """
+    return generate_key_pair(key_size).private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+
+class KeyPool:
+    """This class keeps a number of RSA keys ready, generated in advance by a pool of processes."""
+    size: int
+    key_size: int
+    hits: int # Number of keys taken that were ready
+    misses: int # Number of keys taken that had to be waited for
+
+
+    def __init__(self, size: int = POOL_SIZE, workers: int = os.cpu_count() or 1, key_size: int = KEY_SIZE) -> None:
+        self.size = size
+        self.key_size = key_size
+        self.hits = 0
+        self.misses = 0
+        self._ready: Queue[Union[rsa.RSAPrivateKey, BaseException]] = Queue()
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._closed = False
+        for _ in range(size):
+            self._generate()
+
+
+    def __enter__(self) -> "KeyPool":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    @property
+    def available(self) -> int:
+        """This property returns the number of keys that are ready to be taken."""
+        return self._ready.qsize()
+
+
+    def _generate(self) -> None:
+        """This method asks a worker process for a new key, it is put into the queue when it is ready."""
+        self._executor.submit(_generate_key_der, self.key_size).add_done_callback(self._on_generated)
+
+
+    def _on_generated(self, future: Future) -> None:
+        """This method loads a generated key into the queue. An error is put into the queue too, so take() raises it."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        self._ready.put(error if error is not None else serialization.load_der_private_key(future.result(), password=None))
+
+
+    def take(self, timeout: Optional[float] = None) -> rsa.RSAPrivateKey:
+        """
+        This method returns a new key and starts generating another one to replace it.
+        If no key is ready, it waits for the next one (raising queue.Empty after the timeout).
+        """
+        if self._closed:
+            raise RuntimeError("The key pool is closed")
+        try:
+            key = self._ready.get_nowait()
+            self.hits += 1
+        except Empty:
+            self.misses += 1
+            key = self._ready.get(timeout=timeout)
+
+        self._generate()
+        if isinstance(key, BaseException):
+            raise key
+        return key
+
+
+    def close(self) -> None:
+        """This method stops the worker processes, the keys that are not generated yet are dropped."""
+        self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class KeyStore:
+    """This class saves keys in a directory, encrypted with a password, and loads them lazily."""
+    directory: str
+
+
+    def __init__(self, directory: str, password: Optional[bytes] = None) -> None:
+        self.directory = directory
+        self._password = password
+        # Name -> (version, key), a key is only used while its version is the current one
+        self._private_keys: dict[str, tuple[str, rsa.RSAPrivateKey]] = {}
+        self._public_keys: dict[str, tuple[str, rsa.RSAPublicKey]] = {}
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+
+    def _path(self, name: str, suffix: str, version: Optional[str] = None) -> str:
+        """This method returns the path of a file of the name (of one version of its key), the name cannot leave the directory."""
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise ValueError(f"Invalid key name: { name }")
+        return os.path.join(self.directory, name + suffix if version is None else f"{ name }.{ version }{ suffix }")
+
+
+    def _version(self, name: str) -> Optional[str]:
+        """This method returns the current version of the key of the name, or None if there is no key."""
+        try:
+            with open(self._path(name, CURRENT_SUFFIX)) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+
+    def _write(self, path: str, data: bytes, mode: int) -> None:
+        """This method writes a file to a temporary file first and then renames it, so a reader never sees half a file."""
+        temporary_path = f"{ path }.tmp"
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+
+    def __contains__(self, name: str) -> bool:
+        return self._version(name) is not None
+
+
+    def names(self) -> list[str]:
+        """This method returns the names of the saved keys."""
+        return sorted(file[:-len(CURRENT_SUFFIX)] for file in os.listdir(self.directory) if file.endswith(CURRENT_SUFFIX))
+
+
+    def save(self, name: str, private_key: rsa.RSAPrivateKey) -> None:
+        """
+        This method saves the key under the name, replacing the old key. Both files of the key are written under a new version,
+        then the "<name>.current" file is switched to that version with one rename, so a reader (or another KeyStore) always
+        sees a private and a public key of the same version, and the files of the old version are removed.
+        """
+        public_bytes = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.OpenSSH,
+            format=serialization.PublicFormat.OpenSSH
+        )
+        old_version = self._version(name)
+        version = os.urandom(VERSION_SIZE).hex()
+        # The private key is only readable by its owner
+        self._write(self._path(name, PRIVATE_KEY_SUFFIX, version), serialize_private_key(private_key, self._password), 0o600)
+        self._write(self._path(name, PUBLIC_KEY_SUFFIX, version), public_bytes + b"\n", 0o644)
+        self._write(self._path(name, CURRENT_SUFFIX), version.encode(), 0o644)
+
+        with self._lock:
+            self._private_keys[name] = (version, private_key)
+            self._public_keys[name] = (version, private_key.public_key())
+        if old_version is not None:
+            self._remove_version(name, old_version)
+
+
+    def _remove_version(self, name: str, version: str) -> None:
+        """This method removes the key files of one version of the name."""
+        for suffix in (PRIVATE_KEY_SUFFIX, PUBLIC_KEY_SUFFIX):
+            path = self._path(name, suffix, version)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+    def _load(self, name: str, suffix: str, cache: dict, load: Callable[[bytes], object]):
+        """
+        This method returns the key of the name from the cache if it is still the current version, otherwise it reads the file of
+        the current version with load. If the key is rotated meanwhile and the file was removed, it reads the new version.
+        """
+        while True:
+            version = self._version(name)
+            if version is None:
+                raise KeyError(f"There is no key named { name }")
+            with self._lock:
+                cached = cache.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            try:
+                with open(self._path(name, suffix, version), "rb") as file:
+                    key = load(file.read())
+            except FileNotFoundError:
+                if self._version(name) != version:
+                    continue # Rotated while reading, read the new version
+                raise
+            with self._lock:
+                cache[name] = (version, key)
+            return key
+
+
+    def private_key(self, name: str) -> rsa.RSAPrivateKey:
+        """This method returns the private key of the name, it is read and decrypted again only after the key changed."""
+        return self._load(name, PRIVATE_KEY_SUFFIX, self._private_keys, lambda data: serialization.load_pem_private_key(data, password=self._password))
+
+
+    def public_key(self, name: str) -> rsa.RSAPublicKey:
+        """This method returns the public key of the name from its OpenSSH file, without decrypting the private key."""
+        return self._load(name, PUBLIC_KEY_SUFFIX, self._public_keys, serialization.load_ssh_public_key)
+
+
+    def rotate(self, name: str, pool: KeyPool) -> rsa.RSAPrivateKey:
+        """This method replaces the key of the name with a new key from the pool and returns it."""
+        key = pool.take()
+        self.save(name, key)
+        return key
+
+
+    def delete(self, name: str) -> None:
+        """This method deletes the key of the name, the current version file first so no reader sees half a key."""
+        version = self._version(name)
+        if version is not None:
+            os.remove(self._path(name, CURRENT_SUFFIX))
+            self._remove_version(name, version)
+        with self._lock:
+            self._private_keys.pop(name, None)
+            self._public_keys.pop(name, None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare generating RSA keys on demand with taking them from a pool of pregenerated keys.")
+    parser.add_argument("--keys", type=int, default=10, help="number of keys to take")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="number of keys kept ready")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes generating keys")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between two keys taken, like the requests of a server")
+    arguments = parser.parse_args()
+
+    def report(title: str, latencies: list[float]) -> None:
+        latencies = sorted(latencies)
+        print(f"{ title }: median { latencies[len(latencies) // 2] * 1000:.2f} ms, max { latencies[-1] * 1000:.2f} ms")
+
+    latencies = []
+    for _ in range(arguments.keys):
+        start = perf_counter()
+        generate_key_pair()
+        latencies.append(perf_counter() - start)
+    report("Generated on demand", latencies)
+
+    with KeyPool(arguments.pool_size, arguments.workers) as pool:
+        # Wait until the pool is full, like a server that started a while ago
+        while pool.available < pool.size:
+            sleep(0.01)
+        latencies = []
+        for _ in range(arguments.keys):
+            sleep(arguments.interval)
+            start = perf_counter()
+            pool.take()
+            latencies.append(perf_counter() - start)
+        report("Taken from the pool", latencies)
+        print(f"{ pool.hits } keys were ready, { pool.misses } had to be waited for")
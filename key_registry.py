@@ -0,0 +1,126 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This registry keeps the public keys (RSA, Ed25519 or ECDSA, see signers.py) of many signers, so a signature can be verified with
+# verify(fingerprint, message, signature) without parsing the key again every time.
+# The keys are added as OpenSSH ("ssh-rsa AAAA... comment", like question_3.py prints them) or PEM bytes and are indexed by
+# their fingerprint, the SHA-256 of the OpenSSH key blob in base64 like `ssh-keygen -l` prints it ("SHA256:...").
+# The serialized keys are all kept, but only the most recently used loaded key objects are kept in an LRU cache.
+
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from typing import Iterable
+
+from cryptography.hazmat.primitives import serialization
+
+from signers import PublicKey, signer_for_key
+
+
+CACHE_SIZE: int = 1024 # Number of loaded public keys kept in memory
+
+
+def format_fingerprint(digest: bytes) -> str:
+    """This function formats the raw SHA-256 fingerprint of a key like `ssh-keygen -l` prints it."""
+    return "SHA256:" + b64encode(digest).decode().rstrip("=")
+
+
+def fingerprint_of_blob(blob: bytes) -> str:
+    """This function returns the fingerprint of an OpenSSH key blob, in the format of `ssh-keygen -l`."""
+    return format_fingerprint(sha256(blob).digest())
+
+
+def fingerprint_digest(openssh: bytes) -> bytes:
+    """This function returns the raw SHA-256 fingerprint of an OpenSSH public key ("ssh-ed25519 AAAA... comment")."""
+    return sha256(b64decode(openssh.split()[1])).digest()
+
+
+def fingerprint(public_key: PublicKey) -> str:
+    """This function returns the fingerprint of a loaded public key."""
+    openssh = public_key.public_bytes(serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH)
+    return format_fingerprint(fingerprint_digest(openssh))
+
+
+class KeyRegistry:
+    """This class indexes serialized public keys by fingerprint and loads them lazily into an LRU cache."""
+    cache_size: int
+    hits: int # Number of lookups that found the loaded key in the cache
+    misses: int # Number of lookups that had to parse the key
+
+
+    def __init__(self, cache_size: int = CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._serialized: dict[str, bytes] = {} # Fingerprint -> the serialized key
+        self._cache: OrderedDict[str, PublicKey] = OrderedDict() # The least recently used key is first
+        self._lock = Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._serialized)
+
+
+    def __contains__(self, key_fingerprint: str) -> bool:
+        return key_fingerprint in self._serialized
+
+
+    def add(self, serialized: bytes) -> str:
+        """
+        This method adds an OpenSSH or PEM public key and returns its fingerprint.
+        The fingerprint of an OpenSSH key is computed from its blob, so the key is only parsed when it is used.
+        """
+        serialized = serialized.strip()
+        if not serialized.startswith(b"-----BEGIN"):
+            key_fingerprint = format_fingerprint(fingerprint_digest(serialized))
+            public_key = None
+        else:
+            public_key = serialization.load_pem_public_key(serialized)
+            key_fingerprint = fingerprint(public_key)
+
+        with self._lock:
+            self._serialized[key_fingerprint] = serialized
+            if public_key is not None:
+                self._remember(key_fingerprint, public_key)
+        return key_fingerprint
+
+
+    def add_many(self, keys: Iterable[bytes]) -> list[str]:
+        """This method adds many keys (e.g. the lines of an authorized_keys file, empty lines and comments are skipped)."""
+        return [self.add(key) for key in keys if key.strip() and not key.lstrip().startswith(b"#")]
+
+
+    def _remember(self, key_fingerprint: str, public_key: PublicKey) -> None:
+        """This method puts a loaded key at the end of the cache and drops the least recently used keys. The lock must be held."""
+        self._cache[key_fingerprint] = public_key
+        self._cache.move_to_end(key_fingerprint)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+    def get(self, key_fingerprint: str) -> PublicKey:
+        """This method returns the loaded public key of a fingerprint, it raises KeyError if the key was never added."""
+        with self._lock:
+            public_key = self._cache.get(key_fingerprint)
+            if public_key is not None:
+                self._cache.move_to_end(key_fingerprint)
+                self.hits += 1
+                return public_key
+            serialized = self._serialized[key_fingerprint]
+            self.misses += 1
+
+        # Parse outside of the lock, so the other threads can use the cache meanwhile
+        if serialized.startswith(b"-----BEGIN"):
+            public_key = serialization.load_pem_public_key(serialized)
+        else:
+            public_key = serialization.load_ssh_public_key(serialized)
+        with self._lock:
+            self._remember(key_fingerprint, public_key)
+        return public_key
+
+
+    def verify(self, key_fingerprint: str, message: bytes, signature: bytes) -> bool:
+        """This method verifies the signature of the message with the key of the fingerprint, with the scheme of the key."""
+        public_key = self.get(key_fingerprint)
+        return signer_for_key(public_key).verify(public_key, message, signature)
@@ -0,0 +1,78 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: The mempool keeps the items that are waiting to be put in a block. Instead of mining one block per item,
+# the miner takes a whole batch with take_batch(), which fills the block up to MAX_BLOCK_SIZE bytes in arrival order,
+# so one proof-of-work covers many items. Example:
+#   mempool = Mempool()
+#   mempool.add("Alice pays Bob 5 coins")
+#   block = Block.generate_block(mempool.take_batch(), blockchain[-1])
+
+from collections import deque
+from hashlib import sha256
+from threading import Lock
+
+from question_4 import LENGTH_STRUCT, MAX_BLOCK_SIZE
+
+
+def item_size(item: str) -> int:
+    """This function returns the number of bytes an item takes in a serialized block (its length and the item in UTF-8)."""
+    return LENGTH_STRUCT.size + len(item.encode())
+
+
+class Mempool:
+    """This class queues the items in arrival order and ignores an item that is already waiting."""
+    max_block_size: int # The maximum size in bytes of the items of one batch
+
+
+    def __init__(self, max_block_size: int = MAX_BLOCK_SIZE) -> None:
+        self.max_block_size = max_block_size
+        self._items: deque[str] = deque()
+        self._waiting: set[bytes] = set() # The SHA-256 of the waiting items, to find the duplicates in O(1)
+        self._size = 0 # The total size of the waiting items
+        self._lock = Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+    @property
+    def size(self) -> int:
+        """The total size in bytes of the waiting items."""
+        return self._size
+
+
+    def add(self, item: str) -> bool:
+        """This method adds an item, it returns False if the same item is already waiting."""
+        size = item_size(item)
+        # A block also stores its number of items, so an item must fit next to it
+        if LENGTH_STRUCT.size + size > self.max_block_size:
+            raise ValueError(f"The item is { size } bytes, it does not fit in a block of { self.max_block_size } bytes")
+
+        digest = sha256(item.encode()).digest()
+        with self._lock:
+            if digest in self._waiting:
+                return False
+            self._waiting.add(digest)
+            self._items.append(item)
+            self._size += size
+            return True
+
+
+    def take_batch(self) -> list[str]:
+        """
+        This method removes and returns the oldest items that fit in one block together.
+        It stops at the first item that does not fit, so the items are always mined in arrival order.
+        The oldest item is always taken, so the queue can never get stuck behind it.
+        """
+        batch: list[str] = []
+        batch_size = LENGTH_STRUCT.size # The number of items is also stored in the block
+        with self._lock:
+            while self._items and (not batch or batch_size + item_size(self._items[0]) <= self.max_block_size):
+                item = self._items.popleft()
+                self._waiting.discard(sha256(item.encode()).digest())
+                self._size -= item_size(item)
+                batch_size += item_size(item)
+                batch.append(item)
+        return batch
@@ -0,0 +1,82 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is the Merkle tree used by question_4.py to commit a whole batch of items with one 32-byte root.
+# The leaves and the inner nodes are hashed with a different first byte (0x00 and 0x01, like RFC 6962),
+# so an inner node can never be passed off as an item. When a level has an odd number of nodes,
+# the last node moves up to the next level unchanged instead of being paired with a copy of itself.
+# An inclusion proof is the list of sibling hashes from the leaf to the root, so it has O(log n) hashes.
+
+from hashlib import sha256
+
+
+LEAF_PREFIX: bytes = b"\x00"
+NODE_PREFIX: bytes = b"\x01"
+
+# One step of an inclusion proof: the hash of the sibling and True if the sibling is on the left
+ProofStep = tuple[bytes, bool]
+
+
+def leaf_hash(item: bytes) -> bytes:
+    """This function hashes one item as a leaf of the tree."""
+    return sha256(LEAF_PREFIX + item).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """This function hashes two child nodes into their parent node."""
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """This class builds all the levels of the tree once, so every proof is read in O(log n)."""
+    levels: list[list[bytes]] # levels[0] are the leaf hashes, levels[-1] only has the root
+
+
+    def __init__(self, items: list[bytes]) -> None:
+        if not items:
+            raise ValueError("A Merkle tree needs at least one item")
+
+        level = [leaf_hash(item) for item in items]
+        self.levels = [level]
+        while len(level) > 1:
+            parents = [node_hash(level[index], level[index + 1]) for index in range(0, len(level) - 1, 2)]
+            if len(level) % 2 == 1:
+                parents.append(level[-1]) # The odd node moves up unchanged
+            level = parents
+            self.levels.append(level)
+
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+
+    def proof(self, index: int) -> list[ProofStep]:
+        """This method returns the inclusion proof of the item at the index."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"There is no item at index { index }")
+
+        proof: list[ProofStep] = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level): # The odd node at the end of a level has no sibling
+                proof.append((level[sibling], sibling < index))
+            index //= 2
+        return proof
+
+
+def merkle_root(items: list[bytes]) -> bytes:
+    """This function returns the Merkle root of the items."""
+    return MerkleTree(items).root
+
+
+def verify_proof(item: bytes, proof: list[ProofStep], root: bytes) -> bool:
+    """This function checks that the item is in the tree with the given root, using only its inclusion proof."""
+    current = leaf_hash(item)
+    for sibling, sibling_is_left in proof:
+        current = node_hash(sibling, current) if sibling_is_left else node_hash(current, sibling)
+    return current == root
@@ -0,0 +1,160 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: Printing every nonce made the mining I/O-bound, so the miner only updates these counters
+# and a separate thread redraws the progress line a few times per second.
+
+from time import time as unix_time
+from typing import Optional, TextIO
+from termcolor import colored
+from threading import Event, Lock, Thread
+import json
+import sys
+
+
+FRAMES_PER_SECOND: int = 10 # How many times per second the progress line is redrawn
+
+
+def leading_zeros(hash_result: str) -> int:
+    """This function counts the leading hexadecimal zeros of a hash."""
+    return len(hash_result) - len(hash_result.lstrip('0'))
+
+
+def leading_zero_bits(hash_result: str) -> int:
+    """This function counts the leading zero bits of a hash, which is the difficulty in bits it would meet."""
+    return 4 * len(hash_result) - int(hash_result, 16).bit_length()
+
+
+class MiningMetrics:
+    """The counters of one mining job, they are updated by the miner and read by the renderer."""
+    label: str # The name shown in the progress line, e.g. the block ID
+    attempts: int # Number of nonces tried so far
+    best_hash: Optional[str] # The lowest hash seen so far, which is also the one with the most leading zeros
+    start_time: float
+    end_time: Optional[float] # The time when the job finished, None while it is still running
+
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self.attempts = 0
+        self.best_hash = None
+        self.start_time = unix_time()
+        self.end_time = None
+        self._lock = Lock()
+
+
+    def record(self, attempts: int, best_hash: Optional[str] = None) -> None:
+        """This method adds a number of attempts and the best hash found by them."""
+        with self._lock:
+            self.attempts += attempts
+            if best_hash is not None and (self.best_hash is None or best_hash < self.best_hash):
+                self.best_hash = best_hash
+
+
+    def finish(self) -> None:
+        """This method stops the clock of the job."""
+        self.end_time = unix_time()
+
+
+    @property
+    def elapsed(self) -> float:
+        """The number of seconds since the job started (until it finished)."""
+        return (self.end_time or unix_time()) - self.start_time
+
+
+    @property
+    def hash_rate(self) -> float:
+        """The average number of hashes per second."""
+        elapsed = self.elapsed
+        return self.attempts / elapsed if elapsed > 0 else 0.0
+
+
+    @property
+    def best_leading_zeros(self) -> int:
+        """The highest number of leading hexadecimal zeros seen so far."""
+        return leading_zeros(self.best_hash) if self.best_hash is not None else 0
+
+
+    @property
+    def best_leading_zero_bits(self) -> int:
+        """The highest number of leading zero bits seen so far."""
+        return leading_zero_bits(self.best_hash) if self.best_hash is not None else 0
+
+
+    def to_dict(self) -> dict:
+        """This method returns a snapshot of the counters."""
+        with self._lock:
+            return {
+                "label": self.label,
+                "attempts": self.attempts,
+                "elapsed_seconds": self.elapsed,
+                "hashes_per_second": self.hash_rate,
+                "best_hash": self.best_hash,
+                "best_leading_zeros": self.best_leading_zeros,
+                "best_leading_zero_bits": self.best_leading_zero_bits,
+                "finished": self.end_time is not None,
+            }
+
+
+    def to_json(self) -> str:
+        """This method exports a snapshot of the counters as JSON, e.g. for a dashboard."""
+        return json.dumps(self.to_dict())
+
+
+class ProgressRenderer:
+    """This class redraws the progress line of a mining job at a fixed frame rate from a separate thread."""
+    metrics: MiningMetrics
+    frames_per_second: int
+    stream: TextIO
+
+
+    def __init__(self, metrics: MiningMetrics, frames_per_second: int = FRAMES_PER_SECOND, stream: TextIO = sys.stdout) -> None:
+        self.metrics = metrics
+        self.frames_per_second = frames_per_second
+        self.stream = stream
+        self._stop_event = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+
+    def __enter__(self) -> "ProgressRenderer":
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+    def start(self) -> None:
+        """This method starts the rendering thread."""
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        """This method stops the rendering thread and draws the last frame."""
+        self._stop_event.set()
+        self._thread.join()
+        self.render()
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+    def _run(self) -> None:
+        """This method draws one frame, then sleeps until the next one."""
+        while not self._stop_event.wait(1 / self.frames_per_second):
+            self.render()
+
+
+    def render(self) -> None:
+        """This method draws the current counters on one line, overwriting the previous frame."""
+        snapshot = self.metrics.to_dict()
+        best_hash = snapshot["best_hash"] or ""
+        zeros = snapshot["best_leading_zeros"]
+        colored_best_hash = colored(best_hash[:zeros], "green") + best_hash[zeros:]
+
+        rate = colored(f"{ snapshot['hashes_per_second']:,.0f} hashes/second", "yellow")
+        self.stream.write(
+            f"\rMining block { snapshot['label'] }: { snapshot['attempts']:,} attempts | { rate } | "
+            f"{ snapshot['elapsed_seconds']:.1f} s | best: { colored_best_hash }"
+        )
+        self.stream.flush()
@@ -0,0 +1,189 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is an asyncio service around the mining of question_4.py, so an async program can mine blocks
+# without the input() prompts of the main program. The block data is submitted as jobs to a priority queue,
+# and one job at a time is mined in a separate thread (with a process pool if workers > 1), so the event loop
+# stays responsive while the CPUs are busy. Only one block is mined at a time because every block needs the hash
+# of the block before it. Every job can be awaited, awaited with a timeout, or cancelled.
+# Example:
+#   scheduler = MiningScheduler(blockchain, workers=os.cpu_count())
+#   scheduler.start()
+#   job = await scheduler.submit("Alice pays Bob 5 coins", priority=0)
+#   block = await scheduler.wait(job, timeout=60)
+#   await scheduler.close()
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import count
+from threading import Event
+from time import time as unix_time
+from typing import Optional, Union
+import asyncio
+import os
+
+from question_4 import Block, MiningCancelledError
+
+
+MAX_QUEUE_SIZE: int = 100 # submit() waits when this many jobs are queued, so the producers cannot run too far ahead
+LATENCY_SAMPLES: int = 1000 # Number of the latest finished jobs used for the latency statistics
+
+
+class MiningJob:
+    """One block data (or batch of items, see mempool.py) waiting to be mined, with the future that gets the mined block."""
+    data: Union[str, list[str]]
+    priority: int # The lower the number, the sooner the job is mined
+    submit_time: float
+    start_time: Optional[float] # The time the mining started, None while the job is queued
+    end_time: Optional[float]
+    future: asyncio.Future
+    stop_event: Event # Set to stop the mining of this job
+
+
+    def __init__(self, data: Union[str, list[str]], priority: int, future: asyncio.Future) -> None:
+        self.data = data
+        self.priority = priority
+        self.submit_time = unix_time()
+        self.start_time = None
+        self.end_time = None
+        self.future = future
+        self.stop_event = Event()
+
+
+    def cancel(self) -> None:
+        """This method cancels the job, a queued job is skipped and a running job stops at the next nonce check."""
+        self.stop_event.set()
+        if not self.future.done():
+            self.future.cancel()
+
+
+    @property
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+
+
+class MiningScheduler:
+    """This class mines the submitted jobs in priority order and appends the mined blocks to the chain."""
+    chain: list[Block] # A list of blocks or a ChainStore, it needs the genesis block unless the first job should be the genesis block
+    workers: int # Number of processes used to mine one block
+    completed: int
+    cancelled: int
+
+
+    def __init__(self, chain: list[Block], workers: int = os.cpu_count() or 1, max_queue_size: int = MAX_QUEUE_SIZE) -> None:
+        self.chain = chain
+        self.workers = workers
+        self.completed = 0
+        self.cancelled = 0
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_queue_size)
+        self._sequence = count() # Keeps the jobs with the same priority in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miner")
+        self._current: Optional[MiningJob] = None
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._task: Optional[asyncio.Task] = None
+
+
+    def start(self) -> None:
+        """This method starts the mining loop on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+
+    async def submit(self, data: Union[str, list[str]], priority: int = 0) -> MiningJob:
+        """This method queues a block data and returns its job. It waits while the queue is full."""
+        job = MiningJob(data, priority, asyncio.get_running_loop().create_future())
+        await self._queue.put((priority, next(self._sequence), job))
+        return job
+
+
+    async def wait(self, job: MiningJob, timeout: Optional[float] = None) -> Block:
+        """
+        This method waits until the job is mined and returns its block.
+        If the timeout (in seconds) runs out, the job is cancelled and asyncio.TimeoutError is raised.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            raise
+
+
+    async def _run(self) -> None:
+        """This method takes the jobs from the queue one by one and mines them in the mining thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.cancelled:
+                    self.cancelled += 1
+                    continue
+
+                self._current = job
+                job.start_time = unix_time()
+                previous_block = self.chain[-1] if len(self.chain) else None
+                block = Block.prepare_block(job.data, previous_block)
+                try:
+                    await loop.run_in_executor(self._executor, self._mine, block, job)
+                except MiningCancelledError:
+                    self.cancelled += 1
+                    continue
+                finally:
+                    self._current = None
+                    job.end_time = unix_time()
+
+                self.chain.append(block)
+                self.completed += 1
+                self._latencies.append(job.end_time - job.submit_time)
+                if not job.future.done():
+                    job.future.set_result(block)
+            except Exception as error:
+                # A broken job must not stop the scheduler, its caller gets the error instead
+                if not job.future.done():
+                    job.future.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+
+    def _mine(self, block: Block, job: MiningJob) -> None:
+        """This method runs in the mining thread, it mines the block until a nonce is found or the job is cancelled."""
+        block.mine(workers=self.workers, stop_event=job.stop_event, verbose=False)
+
+
+    def stats(self) -> dict:
+        """This method returns the queue depth, the job in flight, the counters and the latency (submit to mined) in seconds."""
+        latencies = sorted(self._latencies)
+        def percentile(percent: int) -> Optional[float]:
+            return latencies[min(len(latencies) - 1, int(percent / 100 * len(latencies)))] if latencies else None
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_flight": 0 if self._current is None else 1,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "latency_p50_seconds": percentile(50),
+            "latency_p90_seconds": percentile(90),
+            "latency_p99_seconds": percentile(99),
+        }
+
+
+    async def join(self) -> None:
+        """This method waits until every queued job is mined or cancelled."""
+        await self._queue.join()
+
+
+    async def close(self) -> None:
+        """This method cancels the running job, stops the mining loop and the mining thread. The queued jobs are cancelled."""
+        if self._current is not None:
+            self._current.cancel()
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            job.cancel()
+            self._queue.task_done()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,157 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is an optional mining backend for question_4.py, it needs NumPy (pip install numpy).
+# Instead of calling hashlib once per nonce, it runs the SHA-256 compression function on NumPy uint32 arrays,
+# so one call tests a whole batch of nonces and the target is checked for the whole batch at once.
+# The SHA-256 constants and steps follow FIPS 180-4: https://nvlpubs.nist.gov/nistpubs/FIPS/NIST.FIPS.180-4.pdf
+
+from typing import Optional
+import numpy as np
+
+
+BATCH_SIZE: int = 16384 # Number of nonces hashed by one vectorized call
+
+# Initial hash values of SHA-256
+INITIAL_STATE: tuple[int, ...] = (
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+)
+
+# Round constants of SHA-256
+ROUND_CONSTANTS: tuple[int, ...] = (
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+)
+_ROUND_CONSTANTS = np.array(ROUND_CONSTANTS, dtype=np.uint32)
+
+
+def _rotate_right(value: np.ndarray, amount: int) -> np.ndarray:
+    """This function rotates every 32-bit word of the array to the right."""
+    return (value >> np.uint32(amount)) | (value << np.uint32(32 - amount))
+
+
+def compress(state: list[np.ndarray], words: list[np.ndarray]) -> list[np.ndarray]:
+    """
+    This function runs the SHA-256 compression function for a batch of 64-byte blocks.
+    The state is a list of 8 arrays (one word of the state for every message in the batch),
+    and words is a list of 16 arrays with the big-endian words of the blocks. A word that is the same
+    for the whole batch can be given as an array of size 1, NumPy broadcasts it, which saves a lot of work.
+    """
+    schedule = list(words)
+    for index in range(16, 64):
+        s0 = _rotate_right(schedule[index - 15], 7) ^ _rotate_right(schedule[index - 15], 18) ^ (schedule[index - 15] >> np.uint32(3))
+        s1 = _rotate_right(schedule[index - 2], 17) ^ _rotate_right(schedule[index - 2], 19) ^ (schedule[index - 2] >> np.uint32(10))
+        schedule.append(schedule[index - 16] + s0 + schedule[index - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for index in range(64):
+        s1 = _rotate_right(e, 6) ^ _rotate_right(e, 11) ^ _rotate_right(e, 25)
+        choose = (e & f) ^ (~e & g)
+        temp1 = h + s1 + choose + _ROUND_CONSTANTS[index] + schedule[index]
+        s0 = _rotate_right(a, 2) ^ _rotate_right(a, 13) ^ _rotate_right(a, 22)
+        majority = (a & b) ^ (a & c) ^ (b & c)
+        temp2 = s0 + majority
+        h, g, f, e, d, c, b, a = g, f, e, d + temp1, c, b, a, temp1 + temp2
+
+    return [old + new for old, new in zip(state, (a, b, c, d, e, f, g, h))]
+
+
+def pad_message(message: bytes) -> bytes:
+    """This function pads the message to a multiple of 64 bytes as SHA-256 requires."""
+    padding_length = (55 - len(message)) % 64
+    return message + b'\x80' + b'\x00' * padding_length + (len(message) * 8).to_bytes(8, 'big')
+
+
+def digest(message: bytes) -> bytes:
+    """This function hashes one message with the vectorized compression, it is mostly useful for testing."""
+    padded = np.frombuffer(pad_message(message), dtype='>u4').astype(np.uint32).reshape(-1, 16, 1)
+    state = [np.full(1, value, dtype=np.uint32) for value in INITIAL_STATE]
+    for block in padded:
+        state = compress(state, list(block))
+    return b''.join(int(word[0]).to_bytes(4, 'big') for word in state)
+
+
+def _meets_target(state: list[np.ndarray], target: int) -> np.ndarray:
+    """
+    This function checks which hashes of the batch are not above the target, comparing them word by word
+    from the most significant word. It stops as soon as no hash of the batch is still equal to the target so far.
+    """
+    below = np.zeros(state[0].shape, dtype=bool)
+    equal = np.ones(state[0].shape, dtype=bool)
+    for index, word in enumerate(state):
+        target_word = np.uint32((target >> (32 * (7 - index))) & 0xffffffff)
+        below |= equal & (word < target_word)
+        equal &= word == target_word
+        if not equal.any():
+            break
+    return below | equal
+
+
+def _best_hash(state: list[np.ndarray], count: int) -> str:
+    """This function finds the lowest hash of the batch (the one with the most leading zeros) word by word."""
+    candidates = np.arange(count)
+    for word in state:
+        values = word[candidates]
+        candidates = candidates[values == values.min()]
+        if len(candidates) == 1:
+            break
+    return b''.join(int(word[candidates[0]]).to_bytes(4, 'big') for word in state).hex()
+
+
+def search_nonce(prefix: bytes, suffix: bytes, start: int, stop: int, target: int, stop_event = None, metrics = None, batch_size: int = BATCH_SIZE) -> tuple[Optional[int], int]:
+    """
+    This function searches the nonces from start to stop (exclusive) for the message prefix + nonce + suffix,
+    where the nonce is packed as an 8-byte big-endian integer like in the block header of question_4.py.
+    It returns the first valid nonce (or None) and the number of attempts, the same as Block.search_nonce.
+    The metrics (a MiningMetrics, if given) are updated once per batch.
+    """
+    template = pad_message(prefix + bytes(8) + suffix)
+    nonce_offset = len(prefix)
+
+    # The blocks before the nonce are the same for every nonce, so they are hashed once (midstate)
+    first_block = nonce_offset // 64
+    midstate = [np.full(1, value, dtype=np.uint32) for value in INITIAL_STATE]
+    constant_blocks = np.frombuffer(template[:first_block * 64], dtype='>u4').astype(np.uint32).reshape(-1, 16, 1)
+    for block in constant_blocks:
+        midstate = compress(midstate, list(block))
+
+    tail = template[first_block * 64:]
+    tail_words = np.frombuffer(tail, dtype='>u4').astype(np.uint32).reshape(-1, 1)
+    byte_offset = nonce_offset - first_block * 64
+    # Only the words that contain a byte of the nonce differ inside the batch
+    nonce_words = range(byte_offset // 4, (byte_offset + 7) // 4 + 1)
+    window = np.frombuffer(tail[nonce_words.start * 4:nonce_words.stop * 4], dtype=np.uint8)
+    window_offset = byte_offset - nonce_words.start * 4
+
+    for batch_start in range(start, stop, batch_size):
+        if stop_event is not None and stop_event.is_set():
+            return None, batch_start - start
+
+        nonces = np.arange(batch_start, min(batch_start + batch_size, stop), dtype=np.uint64)
+        messages = np.tile(window, (len(nonces), 1))
+        messages[:, window_offset:window_offset + 8] = nonces.astype('>u8').view(np.uint8).reshape(-1, 8)
+        changing_words = messages.view('>u4').astype(np.uint32)
+
+        words = list(tail_words)
+        for column, index in enumerate(nonce_words):
+            words[index] = changing_words[:, column]
+
+        state = midstate
+        for block_start in range(0, len(words), 16):
+            state = compress(state, words[block_start:block_start + 16])
+        state = [np.broadcast_to(word, nonces.shape) for word in state]
+
+        valid = np.flatnonzero(_meets_target(state, target))
+        tried = int(valid[0]) + 1 if len(valid) else len(nonces)
+        if metrics is not None:
+            metrics.record(tried, _best_hash(state, tried))
+        if len(valid):
+            return int(nonces[valid[0]]), batch_start - start + tried
+
+    return None, stop - start
@@ -7,6 +7,19 @@ from termcolor import colored
 from sys import stdout
 
 
+# The sequence of characters of create_sequence_string: lowercase letters, uppercase letters, digits,
+# then the special characters from space to '/' and from ':' to '@' (85 characters)
+SEQUENCE: str = (
+  "".join(chr(index) for index in range(97, 123))  # ASCII values for 'a' to 'z'
+  + "".join(chr(index) for index in range(65, 91))  # ASCII values for 'A' to 'Z'
+  + "".join(chr(index) for index in range(48, 58))  # ASCII values for '0' to '9'
+  + "".join(chr(index) for index in range(32, 48))  # ASCII values for special characters from space to '/'
+  + "".join(chr(index) for index in range(58, 65))  # ASCII values for special characters from ':' to '@'
+)
+# The character that comes after each character in the sequence (the last one has no next character)
+NEXT_CHARACTER: dict[str, str] = dict(zip(SEQUENCE, SEQUENCE[1:]))
+
+
 
 def change_minimal(input_str: str) -> str:
     """
@@ -56,40 +69,29 @@ def highlight_difference(original: str, modified: str) -> tuple[str, str]:
 def create_sequence_string(previous: str | None) -> str:
   """
   This function is used to create a sequence string based on the previous string.
-  It uses a custom sequence of characters: lowercase letters, uppercase letters, and digits.
+  It uses a custom sequence of characters: lowercase letters, uppercase letters, digits and specials.
 
-  This function is created with the help of ChatGPT, which was then revised.
+  This function is created with the help of ChatGPT, which was then revised:
+  the sequence and the next character of every character are now computed once (see SEQUENCE and NEXT_CHARACTER),
+  and the rollover is a loop instead of a recursion.
   """
-  lowercase = [chr(index) for index in range(97, 123)]  # ASCII values for 'a' to 'z'
-  uppercase = [chr(index) for index in range(65, 91)]  # ASCII values for 'A' to 'Z'
-  digits = [chr(index) for index in range(48, 58)]  # ASCII values for '0' to '9'
-  specials = [chr(index) for index in range(32, 48)]  # ASCII values for special characters from space to '/'
-  specials += [chr(index) for index in range(58, 65)]  # ASCII values for special characters from ':' to '@'
-
-  sequence = lowercase + uppercase + digits + specials
-
-  def increment(string):
-    # If the string is empty, return the first character in the sequence, which should be 'a'
-    if not string:
-        return sequence[0]
-
-    last_char = string[-1] # Get the last character of the string
-    rest = string[:-1]  # All characters except the last one
-
-    # Find the index of the last character in the sequence
-    index = sequence.index(last_char)
-
-    # In the case of the last character not being the last in the sequence,
-    # increase it and return the new string
-    if index + 1 < len(sequence):
-        return rest + sequence[index + 1]
-    
-    # Otherwise, we need to rollover this character and increase the rest
-    # rollover, reset this character and increase the rest
-    else:
-        return increment(rest) + sequence[0]
-  
-  return increment(previous)
+  # If the string is empty, return the first character in the sequence, which should be 'a'
+  if not previous:
+    return SEQUENCE[0]
+
+  # Rollover the last characters that are the last in the sequence, e.g. "a@@" becomes "aaa" and then "b" is put back in front
+  characters = list(previous)
+  position = len(characters) - 1
+  while position >= 0 and characters[position] == SEQUENCE[-1]:
+    characters[position] = SEQUENCE[0]
+    position -= 1
+
+  # Increase the first character that is not the last in the sequence, or add a new character if all of them rolled over
+  if position >= 0:
+    characters[position] = NEXT_CHARACTER[characters[position]]
+  else:
+    characters.insert(0, SEQUENCE[0])
+  return "".join(characters)
 
 
 
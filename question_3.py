@@ -3,13 +3,35 @@
 
 # I got the idea to use the `cryptography` library to generate a key pair
 # from: https://stackoverflow.com/questions/2466401/how-to-generate-ssh-key-pairs-with-python
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
+from typing import Optional
+import getpass
 import os
 from termcolor import colored
 
 
+KEY_SIZE: int = 2048
+PUBLIC_EXPONENT: int = 65537
+
+# The padding and hash objects do not keep any state between two operations,
+# so they are created once here instead of for every message
+HASH_ALGORITHM = hashes.SHA256() # SHA256 is a cryptographic hash function. In this case, it is used to hash the message before signing
+# Padding is used to ensure the signature is secure
+# and make the structure of the signature unpredictable
+SIGNATURE_PADDING = padding.PSS(
+    mgf=padding.MGF1(HASH_ALGORITHM), # MGF1 is a mask generation function
+    salt_length=padding.PSS.MAX_LENGTH # Maximum length of salt
+)
+ENCRYPTION_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=HASH_ALGORITHM),
+    algorithm=HASH_ALGORITHM,
+    label=None
+)
+
+
 def clear_console() -> None:
     """
     This function clears the console.
@@ -18,22 +40,62 @@ def clear_console() -> None:
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
+def generate_key_pair(key_size: int = KEY_SIZE) -> rsa.RSAPrivateKey:
+    """This function generates a new RSA key pair, the public key can be get from the private key."""
+    return rsa.generate_private_key(backend=default_backend(), public_exponent=PUBLIC_EXPONENT, key_size=key_size)
+
+
+def serialize_private_key(private_key: rsa.RSAPrivateKey, password: Optional[bytes] = None) -> bytes:
+    """
+    This function returns the private key as PKCS#8 PEM, encrypted with the password if there is one,
+    so the private key is not shown or saved in clear.
+    """
+    encryption = serialization.BestAvailableEncryption(password) if password else serialization.NoEncryption()
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=encryption
+    )
+
+
+def sign_message(private_key: rsa.RSAPrivateKey, message: bytes) -> bytes:
+    """This function signs the message with the private key using RSA-PSS and SHA-256."""
+    return private_key.sign(message, SIGNATURE_PADDING, HASH_ALGORITHM)
+
+
+def verify_signature(public_key: rsa.RSAPublicKey, message: bytes, signature: bytes) -> bool:
+    """This function verifies the signature of the message with the public key, it returns True if it is valid."""
+    try:
+        public_key.verify(signature, message, SIGNATURE_PADDING, HASH_ALGORITHM)
+        return True
+    except InvalidSignature:
+        return False
+
+
+def encrypt_message(public_key: rsa.RSAPublicKey, message: bytes) -> bytes:
+    """This function encrypts the message with the public key using RSA-OAEP and SHA-256."""
+    return public_key.encrypt(message, ENCRYPTION_PADDING)
+
+
+def decrypt_message(private_key: rsa.RSAPrivateKey, ciphertext: bytes) -> bytes:
+    """This function decrypts the ciphertext with the private key using RSA-OAEP and SHA-256."""
+    return private_key.decrypt(ciphertext, ENCRYPTION_PADDING)
+
+
 if __name__ == "__main__":
     clear_console()  # Clear the console for a fresh start
 
     # -------------- Task 1 --------------
 
     # Generate the full key
-    raw_key = rsa.generate_private_key(backend=default_backend(), public_exponent=65537, key_size=2048)
-    input("Successfully generated a key pair! Press Enter to see the private key...")
+    raw_key = generate_key_pair()
+    raw_public_key = raw_key.public_key() # Derived once and reused for every verification and encryption
+    # The password is read without echoing it, so it is not shown on the console like the private key
+    password = getpass.getpass("Successfully generated a key pair! Enter a password to encrypt the private key (empty for none): ").encode()
     
     # Separate the private and public keys
-    private_key = raw_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.TraditionalOpenSSL,
-        encryption_algorithm=serialization.NoEncryption()
-    )
-    public_key = raw_key.public_key().public_bytes(
+    private_key = serialize_private_key(raw_key, password)
+    public_key = raw_public_key.public_bytes(
         encoding=serialization.Encoding.OpenSSH,
         format=serialization.PublicFormat.OpenSSH
     )
@@ -60,16 +122,7 @@ if __name__ == "__main__":
 
     # Sign the message with the private key
     clear_console()  # Clear the console for a fresh start
-    signature = raw_key.sign(
-        message.encode(),
-        # Padding is used to ensure the signature is secure
-        # and make the structure of the signature unpredictable
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()), # MGF1 is a mask generation function 
-            salt_length=padding.PSS.MAX_LENGTH # Maximum length of salt
-        ),
-        hashes.SHA256() # SHA256 is a cryptographic hash function. In this case, it is used to hash the message before signing
-    )
+    signature = sign_message(raw_key, message.encode())
     title = colored("This is the message signed by the private key:", "blue")
     print(f"{ title } { signature.hex() }", end="\n\n")
     input("Press Enter to verify the signature...")
@@ -79,66 +132,34 @@ if __name__ == "__main__":
     clear_console()  # Clear the console for a fresh start
     # Verify the signature with the public key
     title = colored("Verification status:", "blue")
-    # The defailt status is invalid
-    status = colored("Invalid!", "red")
-    try:
-        raw_key.public_key().verify(
-            signature, message.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+    if verify_signature(raw_public_key, message.encode(), signature):
         status = colored("Valid!", "green")
-    except Exception as exc:
-        ...
-    finally:
-        print(f"{ title } { status }", end="\n\n")
-        input("Press Enter to verify the signature with another key...")
+    else:
+        status = colored("Invalid!", "red")
+    print(f"{ title } { status }", end="\n\n")
+    input("Press Enter to verify the signature with another key...")
 
     # -------------- JUST FOR FUN =)) --------------
 
     clear_console()  # Clear the console for a fresh start
-    another_raw_key = rsa.generate_private_key(backend=default_backend(), public_exponent=65537, key_size=2048)
+    another_raw_key = generate_key_pair()
     title = colored("Generated another key with the private key:", "blue")
     print(title, end="\n\n")
-    print(another_raw_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.TraditionalOpenSSL,
-        encryption_algorithm=serialization.NoEncryption()
-    ).decode(), end="\n\n")
+    print(serialize_private_key(another_raw_key, password).decode(), end="\n\n")
     
     # Verify the signature with the another public key
     title = colored("Verification status with another key:", "blue")
-    status = colored("Invalid!", "red")
-    try:
-        another_raw_key.public_key().verify(
-            signature, message.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+    if verify_signature(another_raw_key.public_key(), message.encode(), signature):
         status = colored("Valid!", "green")
-    except Exception as exc:
-        ...
-    finally:
-        print(f"{ title } { status }", end="\n\n")
-        input("Press Enter to encrypt the message with the old public key...")
+    else:
+        status = colored("Invalid!", "red")
+    print(f"{ title } { status }", end="\n\n")
+    input("Press Enter to encrypt the message with the old public key...")
 
     
     # Encrypt the message with the public key
     clear_console()  # Clear the console for a fresh start
-    ciphertext = raw_key.public_key().encrypt(
-        message.encode(),
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    ciphertext = encrypt_message(raw_public_key, message.encode())
     title = colored("Encrypted message with the public key:", "blue")
     print(f"{ title } {ciphertext.hex()}", end="\n\n")
     input("Press Enter to decrypt the message with the private key...")
@@ -146,13 +167,6 @@ if __name__ == "__main__":
     clear_console()
 
     # Decrypt the message with the private key
-    decrypted_message = raw_key.decrypt(
-        ciphertext,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    decrypted_message = decrypt_message(raw_key, ciphertext)
     title = colored("Decrypted message with the private key:", "blue")
     print(f"{ title } {decrypted_message.decode()}")
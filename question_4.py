@@ -3,24 +3,81 @@
 
 from time import time as unix_time
 from hashlib import md5, sha256
-from typing import  Optional
+from typing import  Optional, Union
 from termcolor import colored
 from datetime import datetime
 from random import randint, choice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import Event
+from mining_metrics import MiningMetrics, ProgressRenderer
+from merkle import MerkleTree, ProofStep, verify_proof
+from signers import SIGNERS, PrivateKey, PublicKey, signer_for_key
+from key_registry import fingerprint_digest, format_fingerprint
+from cryptography.hazmat.primitives.serialization import load_ssh_public_key
+import math
 import os
-
-
-DIFFICULTY: int = 3
+import re
+import struct
+
+
+DIFFICULTY: int = 3 # The number of leading hexadecimal zeros of the block hash (4 bits each)
+# Set this to give the difficulty in bits instead, e.g. 13 is twice as hard as 12 (DIFFICULTY 3). None uses DIFFICULTY.
+DIFFICULTY_BITS: Optional[int] = None
+# Set this to a number of seconds to retarget automatically: after every block the target is adjusted from the time
+# that block took to mine, so the blocks keep taking about this long when the hash rate changes. None keeps a fixed target.
+BLOCK_INTERVAL: Optional[float] = None
+RETARGET_DAMPING: int = 4 # The target moves 1/RETARGET_DAMPING of the way towards the observed hash rate per block
+RETARGET_MAX_FACTOR: int = 4 # The observed mining time is clamped to [interval / 4, interval * 4], against outliers
+MAX_TARGET: int = 2 ** 256 - 1 # The easiest target, every hash meets it
 DEFAULT_NONCE: int = 0
-GENESIS_PREVIOUS_HASH: str = "0"
+GENESIS_PREVIOUS_HASH: str = "0" * 64
 GENESIS_DATA: str = "Genesis block"
 NUMBER_OF_BLOCKS: int = 5 # Edit this to change the number of blocks to be created in the main function
+MAX_BLOCK_SIZE: int = 1024 * 1024 # The maximum size in bytes of the items of one block (see Block.to_bytes)
+
+# Edit this to mine with multiple processes, e.g. os.cpu_count(). 1 keeps the original single-core mining.
+MINING_WORKERS: int = 1
+NONCE_RANGE_SIZE: int = 50_000 # Number of nonces a worker process searches before it is given the next range
+STOP_CHECK_INTERVAL: int = 1024 # How often (in nonces) a worker process checks if another worker already found the nonce
+
+# The backend used to hash the nonces: "hashlib" tests one nonce per call,
+# "numpy" tests a whole batch per call with a vectorized SHA-256 (it needs NumPy, see numpy_miner.py)
+MINING_BACKEND: str = "hashlib"
 
-# Turn on this for cool effect! But it will slow down the mining process.
-# If you turn on the DEBUG mode, the mining process will print the hash in a colored format and amount of time used to mine the nonce.
-# I suggest you lower the DIFFICULTY to 2 or 3 for a better experience if you want to see the effect.
+# Set this to a folder (e.g. "chain") to save the mined blocks on disk with chain_store.py.
+# If the folder already has a chain, the main program continues it instead of creating a new genesis block.
+CHAIN_DIRECTORY: Optional[str] = None
+
+# Set this to a signature scheme of signers.py (e.g. "ed25519") to sign every mined block with a key generated when the program starts.
+# The block then carries the public key of its producer and a signature over its header (see Block.sign).
+SIGNING_SCHEME: Optional[str] = None
+
+# Turn on this for cool effect!
+# If you turn on the DEBUG mode, the mining process will show a live progress line (attempts, hash rate and the best hash so far)
+# and the amount of time used to mine the nonce. The line is redrawn by another thread, so it does not slow down the mining.
 DEBUG: bool = True
 
+# The binary block header: block counter, block ID (raw MD5), timestamp, Merkle root of the items (see merkle.py),
+# previous hash (raw SHA-256), target (256-bit big-endian), confirm time, producer fingerprint and nonce. It is 176 bytes
+# and the block hash is computed over it, so hashing a block costs the same however many items it has.
+# The nonce is the last field, so the first 168 bytes stay the same while mining.
+HEADER_STRUCT = struct.Struct(">Q16sd32s32s32sd32sQ")
+HEADER_PREFIX_STRUCT = struct.Struct(">Q16sd32s32s32sd32s") # The header without the nonce
+NONCE_STRUCT = struct.Struct(">Q")
+MERKLE_ROOT_OFFSET: int = 32 # Where the Merkle root starts in the header
+LENGTH_STRUCT = struct.Struct(">I") # The number of items, and the length of every item, in Block.to_bytes
+# The signature cannot be in the header, because it signs the header, so a signed block has its producer key (OpenSSH)
+# and signature after the items in Block.to_bytes, each with its length. An unsigned block is serialized like before.
+# The header has the fingerprint of the producer key instead (the SHA-256 of its OpenSSH blob, see key_registry.py), which is
+# set before mining, so the key of a mined block cannot be swapped and the block cannot be signed again by someone else.
+NO_PRODUCER: bytes = bytes(32) # The producer fingerprint of an unsigned block
+
+# The human-readable string format of the block, see Block.__str__
+BLOCK_STRING_PATTERN = re.compile(
+    r"^ID: (?P<block_id>\S+) \| Timestamp: (?P<timestamp>\d+) \| Data: (?P<data>.*) \| Previous: (?P<previous_hash>\S+) \| None: (?P<nonce>\d+) \| Confirmed: (?P<confirm_time>\S+)$",
+    re.DOTALL,
+)
+
 
 def clear_console() -> None:
     """
@@ -48,6 +105,41 @@ def random_string(length: int = 10) -> str:
     return ''.join(random_string)
 
 
+def target_from_bits(bits: int) -> int:
+    """This function returns the target of a difficulty in bits: a hash meets it if its first bits are zero."""
+    return MAX_TARGET >> bits
+
+
+def difficulty_bits(target: int) -> float:
+    """This function returns the difficulty of a target in bits, the inverse of target_from_bits (it can be fractional)."""
+    return 256 - math.log2(target + 1)
+
+
+def initial_target() -> int:
+    """This function returns the target of the genesis block (and of every block if retargeting is off)."""
+    return target_from_bits(DIFFICULTY_BITS if DIFFICULTY_BITS is not None else 4 * DIFFICULTY)
+
+
+def next_target(previous_block: "Block", block_interval: Optional[float] = None) -> int:
+    """
+    This function returns the target of the block after the previous block.
+    Without a block interval (see BLOCK_INTERVAL) the target does not change. Otherwise the target is scaled by
+    the time the previous block took to mine compared to the interval, damped over RETARGET_DAMPING blocks.
+    Only the header of the previous block is used and the math is done on integers, so every node gets the same target.
+    """
+    block_interval = BLOCK_INTERVAL if block_interval is None else block_interval
+    if block_interval is None:
+        return previous_block.target
+
+    interval = max(1, round(block_interval * 1_000_000)) # In microseconds
+    observed = round((previous_block.confirm_time - previous_block.timestamp) * 1_000_000)
+    observed = min(max(observed, interval // RETARGET_MAX_FACTOR), interval * RETARGET_MAX_FACTOR)
+
+    # A slow block makes the target bigger (easier), a fast block makes it smaller (harder)
+    target = previous_block.target * ((RETARGET_DAMPING - 1) * interval + observed) // (RETARGET_DAMPING * interval)
+    return min(max(target, 1), MAX_TARGET)
+
+
 def print_arrow_up() -> None:
     """This function prints an arrow up symbol."""
     print("                                      /|\        ")
@@ -57,27 +149,99 @@ def print_arrow_up() -> None:
     print("                                       |         ", end="\n\n")
 
 
+class MiningCancelledError(Exception):
+    """This error is raised by Block.mine when its stop event is set before a valid nonce is found."""
+
+
+# The stop event shared by all mining processes, it is set by the initializer of the process pool
+_stop_event = None
+
+
+def _init_mining_worker(stop_event) -> None:
+    """This function stores the shared stop event inside each mining process."""
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _search_nonce_range(block: "Block", start: int, stop: int, backend: str) -> tuple[Optional[int], float, int, Optional[str]]:
+    """
+    This function searches the nonces from start to stop (exclusive) for the given block inside a worker process.
+    The confirm time is set once for the whole range, so the block can be re-hashed later with the same result.
+    It returns the valid nonce (or None), the confirm time used, the number of attempts and the best hash of the range.
+    """
+    block.confirm_time = unix_time()
+    metrics = MiningMetrics()
+    nonce, attempts = block.search_nonce(start, stop, stop_event=_stop_event, metrics=metrics, backend=backend)
+    return nonce, block.confirm_time, attempts, metrics.best_hash
+
+
 class Block:
+    # The fields are stored in slots instead of a __dict__, which saves memory when the chain gets long
+    __slots__ = ("block_counter", "block_id", "timestamp", "items", "merkle_root", "previous_hash", "target", "nonce", "confirm_time", "producer_fingerprint", "producer_key", "signature", "start_time", "end_time")
+
     block_counter: int  # Static variable to keep track of the number of blocks created
     block_id: str
     timestamp: float # UNIX timestamp when the block is created (not mined or confirmed)
-    data: str
+    items: tuple[str, ...] # The batch of data of the block, a normal block has only one item
+    merkle_root: bytes # The Merkle root of the items, it is the only part of the items in the header
     previous_hash: str
+    target: int # The block hash, read as a 256-bit number, must be at most this (see target_from_bits)
     nonce: int
     confirm_time: float # The time when the block is mined (confirmed)
+    producer_fingerprint: bytes # The fingerprint of the producer key in the header (see key_registry.fingerprint_digest), NO_PRODUCER if it is not signed
+    producer_key: bytes # The OpenSSH public key of the producer who signed the block, empty if it is not signed
+    signature: bytes # The signature of the header by the producer, empty if it is not signed
 
     # This variable just for fun!
     start_time: float # The time when the block is start to be mined
     end_time: float # The time when the block is mined (not used in this version, but can be used for future improvements)
 
 
-    def __init__(self, block_counter: int, data: str, previous_hash: str) -> None:
+    def __init__(self, block_counter: int, data: Union[str, list[str]], previous_hash: str, target: Optional[int] = None) -> None:
         self.block_counter = block_counter
         self.block_id = self._generate_block_ID()
         self.timestamp = unix_time()  # Set the timestamp to the current time
-        self.data = data
+        self.set_items([data] if isinstance(data, str) else data)
         self.previous_hash = previous_hash
+        self.target = initial_target() if target is None else target
         self.nonce = DEFAULT_NONCE
+        self.producer_fingerprint = NO_PRODUCER
+        self.producer_key = b""
+        self.signature = b""
+
+
+    def set_items(self, items: list[str]) -> None:
+        """This method sets the batch of items of the block and computes their Merkle root once."""
+        if not items:
+            raise ValueError("A block needs at least one item")
+        self.items = tuple(items)
+        self.merkle_root = MerkleTree([item.encode() for item in self.items]).root
+
+
+    @property
+    def data(self) -> str:
+        """The data of the block. For a batch, the items are joined with a comma."""
+        return self.items[0] if len(self.items) == 1 else ", ".join(self.items)
+
+
+    @data.setter
+    def data(self, data: str) -> None:
+        self.set_items([data])
+
+
+    def inclusion_proof(self, index: int) -> list[ProofStep]:
+        """This method returns the O(log n) proof that the item at the index is in this block."""
+        return MerkleTree([item.encode() for item in self.items]).proof(index)
+
+
+    @staticmethod
+    def verify_inclusion(header: bytes, item: str, proof: list[ProofStep]) -> bool:
+        """
+        This method checks that the item is in the block with the given binary header, using only its inclusion proof,
+        so a client does not need the other items of the block.
+        """
+        merkle_root = header[MERKLE_ROOT_OFFSET:MERKLE_ROOT_OFFSET + 32]
+        return verify_proof(item.encode(), proof, merkle_root)
 
 
     @classmethod
@@ -87,72 +251,348 @@ class Block:
 
 
     @classmethod
-    def generate_block(cls, data: Optional[str] = None, previous_block: Optional["Block"] = None) -> "Block":
+    def generate_block(cls, data: Optional[Union[str, list[str]]] = None, previous_block: Optional["Block"] = None, private_key: Optional[PrivateKey] = None) -> "Block":
         """
-        This method generates a new block with the given data and previous block, and also mine the nonce.
+        This method generates a new block with the given data (or batch of items) and previous block, and also mine the nonce.
         In case of the genesis block, it will use the default data and previous hash.
         If no data is provided, it will use the default genesis data.
+        If a private key is given, its fingerprint is put in the header before mining and the mined block is signed with it.
         """
-        block = cls(
+        block = cls.prepare_block(data, previous_block)
+        if private_key is not None:
+            block.set_producer(private_key.public_key())
+        block.mine()
+        if private_key is not None:
+            block.sign(private_key)
+        return block
+
+
+    @classmethod
+    def prepare_block(cls, data: Optional[Union[str, list[str]]] = None, previous_block: Optional["Block"] = None) -> "Block":
+        """This method creates the next block after the previous block (or the genesis block) without mining it."""
+        return cls(
             block_counter = 0 if previous_block is None else previous_block.block_counter + 1,
             data = GENESIS_DATA if previous_block is None else data,
             previous_hash = GENESIS_PREVIOUS_HASH if previous_block is None else Block.hash_block(previous_block),
+            target = None if previous_block is None else next_target(previous_block),
         )
-        block.mine()
-        return block
-
 
-    def mine(self) -> None:
-        """This method mines the block by finding a nonce that satisfies the difficulty requirement."""
-        print(f"Mining block {self.block_id}...")
 
-        self.start_time = unix_time()
-        self.confirm_time = unix_time()  # Set the confirm_time to the current time
+    def mine(self, workers: int = MINING_WORKERS, metrics: Optional[MiningMetrics] = None, stop_event = None, verbose: bool = True) -> MiningMetrics:
+        """
+        This method mines the block by finding a nonce whose block hash is not above the target.
+        If more than one worker is given, the nonce space is split into ranges and searched by a process pool.
+        It returns the metrics of the mining (attempts, hash rate, best hash...), which can be exported as JSON.
+        If the stop event (a threading or multiprocessing Event) is set before a nonce is found, MiningCancelledError is raised.
+        Nothing is printed if verbose is False.
+        """
+        if verbose:
+            print(f"Mining block {self.block_id}...")
 
-        # Hash the block and check if it starts with the required number of zeros
-        hash_result = Block.hash_block(self)
+        metrics = metrics if metrics is not None else MiningMetrics(self.block_id)
+        renderer = ProgressRenderer(metrics) if DEBUG and verbose else None
+        if renderer is not None:
+            renderer.start()
 
-        # In case the hash already satisfies the difficulty requirement, we can skip the mining process
-        # If not, we will keep incrementing the nonce until we find a valid hash
-        while not hash_result.startswith('0' * DIFFICULTY):
-            self.nonce += 1 # Update the nonce
-            self.confirm_time = unix_time()  # Update the confirm_time to the current time
-            hash_result = Block.hash_block(self) # Hash the block again with the new nonce
-
-            # Where the cool effect happens
-            if DEBUG:
-                console_hash_output: list = []
-                for index in range(DIFFICULTY):
-                    if hash_result[index] == '0':
-                        console_hash_output.append(colored(hash_result[index], 'green'))
-                    else:
-                        console_hash_output.append(colored(hash_result[index], 'red'))
-                # Append the rest of the hash
-                console_hash_output += hash_result[DIFFICULTY:]
-                print(f"\rMining block { self.block_id } with nonce { self.nonce }: { ''.join(console_hash_output) }", end='\n')
-
-        # Once we find a valid nonce, we can print the result
-        self.end_time = unix_time()
-
-        if DEBUG:
+        self.start_time = unix_time()
+        try:
+            if workers > 1:
+                self._mine_parallel(workers, metrics, stop_event)
+            else:
+                self._mine_sequential(metrics, stop_event)
+        finally:
+            # Once we find a valid nonce (or we are stopped), we can print the result
+            self.end_time = unix_time()
+            metrics.finish()
+            if renderer is not None:
+                renderer.stop()
+
+        if not verbose:
+            return metrics
+
+        if renderer is not None:
             consume_time = self.end_time - self.start_time
             consume_time = colored(f"{consume_time:.2f} seconds", "yellow")
             # Print the time taken to mine the block
             print(f"\nBlock { self.block_id } mined in { consume_time }.")
 
-            hash_rate = self.nonce / (self.end_time - self.start_time)
-            hash_rate = colored(f"{hash_rate:.2f} hashes/second", "yellow")
+            hash_rate = colored(f"{metrics.hash_rate:.2f} hashes/second", "yellow")
             print(f"Hash rate: { hash_rate }")
 
         # Print 2 empy lines for better readability
         print("\n\n", end="")
-                    
+        return metrics
+
+
+    def _mine_sequential(self, metrics: MiningMetrics, stop_event = None) -> None:
+        """
+        This method searches the nonce range by range on a single core.
+        The confirm time is updated at the start of every range instead of on every nonce.
+        """
+        # In case the hash already satisfies the difficulty requirement, we can skip the mining process
+        # If not, we will keep searching the next range until we find a valid hash
+        while True:
+            self.confirm_time = unix_time()  # Update the confirm_time to the current time
+            start = self.nonce
+            nonce, _ = self.search_nonce(start, start + NONCE_RANGE_SIZE, stop_event=stop_event, metrics=metrics, backend=MINING_BACKEND)
+            if nonce is not None:
+                self.nonce = nonce
+                return
+            if stop_event is not None and stop_event.is_set():
+                raise MiningCancelledError(f"Mining of block { self.block_id } was cancelled")
+            self.nonce = start + NONCE_RANGE_SIZE
+
+
+    def search_nonce(self, start: int, stop: int, target: Optional[int] = None, stop_event = None, metrics: Optional[MiningMetrics] = None, backend: str = "hashlib") -> tuple[Optional[int], int]:
+        """
+        This method searches the nonces from start to stop (exclusive) and returns the first valid nonce (or None)
+        and the number of attempts. It does not change the block itself. The target defaults to the target of the block.
+
+        Only the nonce changes between two attempts, so the header before the nonce is packed and fed into
+        SHA-256 once. Every attempt copies that pre-fed state and only hashes the 8 bytes of the nonce.
+        The raw digest is compared with the target as bytes, which is the same as comparing the big-endian numbers
+        and does not need hexdigest().
+        The stop event is checked every STOP_CHECK_INTERVAL nonces, and the metrics (if given) are updated at the same time.
+        With the "numpy" backend the nonces are tested in batches instead, which gives the same nonce.
+        """
+        target = self.target if target is None else target
+        prefix = self._header_prefix()
+        if backend == "numpy":
+            import numpy_miner  # Imported here because NumPy is optional
+            return numpy_miner.search_nonce(prefix, b"", start, stop, target, stop_event=stop_event, metrics=metrics)
+        elif backend != "hashlib":
+            raise ValueError(f"Unknown mining backend: { backend }")
+
+        midstate = sha256(prefix)
+        target_bytes = target.to_bytes(32, "big")
+        copy_state = midstate.copy
+        pack_nonce = NONCE_STRUCT.pack
+
+        for chunk_start in range(start, stop, STOP_CHECK_INTERVAL):
+            # Stop early if another worker already found a valid nonce
+            if stop_event is not None and stop_event.is_set():
+                return None, chunk_start - start
+
+            chunk_stop = min(chunk_start + STOP_CHECK_INTERVAL, stop)
+            best_digest = b"\xff" * 32  # The lowest hash of the chunk, it has the most leading zeros
+            for nonce in range(chunk_start, chunk_stop):
+                state = copy_state()
+                state.update(pack_nonce(nonce))
+                digest = state.digest()
+                if digest < best_digest:
+                    best_digest = digest
+                if digest <= target_bytes:
+                    if metrics is not None:
+                        metrics.record(nonce - chunk_start + 1, best_digest.hex())
+                    return nonce, nonce - start + 1
+
+            if metrics is not None:
+                metrics.record(chunk_stop - chunk_start, best_digest.hex())
+
+        return None, stop - start
+
+
+    def _mine_parallel(self, workers: int, metrics: MiningMetrics, cancel_event = None) -> None:
+        """
+        This method splits the nonce space into disjoint ranges and searches them with a process pool.
+        Every worker asks for a new range when its range is exhausted. Once a valid nonce is found (or the cancel event is set),
+        the other workers are stopped and the pending ranges are cancelled.
+        The metrics are updated every time a worker finishes a range.
+        """
+        stop_event = Event()
+        found: Optional[tuple[int, float]] = None
+        next_start = self.nonce
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_mining_worker, initargs=(stop_event,)) as executor:
+            pending = set()
+            for _ in range(workers):
+                pending.add(executor.submit(_search_nonce_range, self, next_start, next_start + NONCE_RANGE_SIZE, MINING_BACKEND))
+                next_start += NONCE_RANGE_SIZE
+
+            while found is None:
+                # Wake up regularly to check if the mining was cancelled
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                for future in done:
+                    nonce, confirm_time, tried, best_hash = future.result()
+                    metrics.record(tried, best_hash)
+                    # Keep the lowest nonce in case more than one range finished with a result
+                    if nonce is not None and (found is None or nonce < found[0]):
+                        found = (nonce, confirm_time)
+
+                # Give the idle workers the next ranges
+                if found is None:
+                    for _ in done:
+                        pending.add(executor.submit(_search_nonce_range, self, next_start, next_start + NONCE_RANGE_SIZE, MINING_BACKEND))
+                        next_start += NONCE_RANGE_SIZE
+
+            # Tell the running workers to stop and drop the ranges that have not started yet
+            stop_event.set()
+            for future in pending:
+                future.cancel()
+
+        if found is None:
+            raise MiningCancelledError(f"Mining of block { self.block_id } was cancelled")
+        self.nonce, self.confirm_time = found
+
+
     
     @classmethod
     def hash_block(cls, block: "Block") -> str:
-        """This method hashes the block using SHA-256."""
-        return sha256(str(block).encode()).hexdigest()
-    
+        """This method hashes the binary header of the block using SHA-256."""
+        return sha256(block.header_bytes()).hexdigest()
+
+
+    def _header_prefix(self) -> bytes:
+        """This method packs the header without the nonce."""
+        return HEADER_PREFIX_STRUCT.pack(
+            self.block_counter,
+            bytes.fromhex(self.block_id),
+            self.timestamp,
+            self.merkle_root,
+            bytes.fromhex(self.previous_hash),
+            self.target.to_bytes(32, "big"),
+            self.confirm_time,
+            self.producer_fingerprint,
+        )
+
+
+    def header_bytes(self) -> bytes:
+        """This method packs the block header into its fixed 176-byte binary form."""
+        return self._header_prefix() + NONCE_STRUCT.pack(self.nonce)
+
+
+    def set_producer(self, public_key: PublicKey) -> None:
+        """
+        This method keeps the public key of the producer (of any scheme of signers.py) in the block and puts its fingerprint
+        in the header. The header is mined with the fingerprint, so this must be done before mining.
+        """
+        self.producer_key = signer_for_key(public_key).public_bytes(public_key)
+        self.producer_fingerprint = fingerprint_digest(self.producer_key)
+
+
+    def sign(self, private_key: PrivateKey) -> None:
+        """
+        This method signs the header of the mined block (the bytes hashed by hash_block) with the private key of the producer.
+        The header must not change after this, so the block must be mined first, with the producer set by set_producer.
+        It raises ValueError if the header has the fingerprint of another key.
+        """
+        signer = signer_for_key(private_key)
+        producer_key = signer.public_bytes(private_key.public_key())
+        if fingerprint_digest(producer_key) != self.producer_fingerprint:
+            raise ValueError("The block was not mined for this producer, call set_producer before mining")
+        self.producer_key = producer_key
+        self.signature = signer.sign(private_key, self.header_bytes())
+
+
+    def verify_signature(self) -> bool:
+        """
+        This method checks that the block is signed by the producer key of its header. It parses the key every time,
+        so ChainValidator uses a KeyRegistry instead to verify many blocks of the same producers.
+        """
+        if not self.signature or fingerprint_digest(self.producer_key) != self.producer_fingerprint:
+            return False
+        public_key = load_ssh_public_key(self.producer_key)
+        return signer_for_key(public_key).verify(public_key, self.header_bytes(), self.signature)
+
+
+    @classmethod
+    def from_header(cls, header: bytes, data: Union[str, list[str]]) -> "Block":
+        """
+        This method rebuilds a block from its binary header and its data (or batch of items).
+        The header only keeps the Merkle root of the items, so the items must be given and they must match that root.
+        """
+        block_counter, block_id, timestamp, merkle_root, previous_hash, target, confirm_time, producer_fingerprint, nonce = HEADER_STRUCT.unpack(header)
+
+        block = cls.__new__(cls)
+        block.set_items([data] if isinstance(data, str) else data)
+        if block.merkle_root != merkle_root:
+            raise ValueError("The items do not match the Merkle root in the header")
+        block.block_counter = block_counter
+        block.block_id = block_id.hex()
+        block.timestamp = timestamp
+        block.previous_hash = previous_hash.hex()
+        block.target = int.from_bytes(target, "big")
+        block.confirm_time = confirm_time
+        block.nonce = nonce
+        block.producer_fingerprint = producer_fingerprint
+        block.producer_key = b""
+        block.signature = b""
+        return block
+
+
+    def to_bytes(self) -> bytes:
+        """
+        This method serializes the whole block: the binary header, the number of items,
+        then every item as its length followed by the item in UTF-8.
+        A signed block ends with its producer key and its signature, each after its length.
+        """
+        parts = [self.header_bytes(), LENGTH_STRUCT.pack(len(self.items))]
+        for item in self.items:
+            encoded = item.encode()
+            parts.append(LENGTH_STRUCT.pack(len(encoded)))
+            parts.append(encoded)
+        if self.signature:
+            parts += [LENGTH_STRUCT.pack(len(self.producer_key)), self.producer_key, LENGTH_STRUCT.pack(len(self.signature)), self.signature]
+        return b"".join(parts)
+
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "Block":
+        """This method rebuilds a block serialized by to_bytes."""
+        raw = memoryview(raw)
+        position = HEADER_STRUCT.size
+        (count,) = LENGTH_STRUCT.unpack_from(raw, position)
+        position += LENGTH_STRUCT.size
+
+        items = []
+        for _ in range(count):
+            (length,) = LENGTH_STRUCT.unpack_from(raw, position)
+            position += LENGTH_STRUCT.size
+            items.append(bytes(raw[position:position + length]).decode())
+            position += length
+        block = cls.from_header(bytes(raw[:HEADER_STRUCT.size]), items)
+
+        # The producer key and the signature of a signed block
+        if position < len(raw):
+            fields = []
+            for _ in range(2):
+                (length,) = LENGTH_STRUCT.unpack_from(raw, position)
+                position += LENGTH_STRUCT.size
+                fields.append(bytes(raw[position:position + length]))
+                position += length
+            if position != len(raw):
+                raise ValueError("The block has unexpected bytes after its signature")
+            block.producer_key, block.signature = fields
+        return block
+
+
+    @classmethod
+    def from_string(cls, text: str, block_counter: int) -> "Block":
+        """
+        This method rebuilds a block from its string representation (see __str__).
+        The string does not contain the block counter, so it must be given, and the timestamp is only kept in seconds.
+        The string does not contain the target either, so the block gets the initial target.
+        """
+        match = BLOCK_STRING_PATTERN.match(text)
+        if match is None:
+            raise ValueError("The text is not a block in the string format")
+
+        block = cls.__new__(cls)
+        block.block_counter = block_counter
+        block.block_id = match["block_id"]
+        block.timestamp = float(match["timestamp"])
+        block.data = match["data"]
+        block.previous_hash = match["previous_hash"]
+        block.target = initial_target()
+        block.nonce = int(match["nonce"])
+        block.confirm_time = float(match["confirm_time"])
+        block.producer_fingerprint = NO_PRODUCER
+        block.producer_key = b""
+        block.signature = b""
+        return block
+
 
     def __str__(self, show_human_time: bool = False) -> str:
         """This method returns a string representation of the block."""
@@ -182,18 +622,30 @@ class Block:
         print(f"| {timestamp_str.ljust(88)} |")
 
         colored_data = colored("Data:", "blue")
-        data_str = f"{ colored_data } {self.data}"
+        # A batch does not fit in the box, so only the number of items and their Merkle root are shown
+        data = self.data if len(self.items) == 1 else f"{ len(self.items) } items, Merkle root { self.merkle_root.hex()[:16] }..."
+        data_str = f"{ colored_data } {data}"
         print(f"| {data_str.ljust(88)} |")
 
+        colored_difficulty = colored("Difficulty:", "blue")
+        difficulty_str = f"{ colored_difficulty } {difficulty_bits(self.target):.2f} bits"
+        print(f"| {difficulty_str.ljust(88)} |")
+
         colored_nonce = colored("Nonce:", "blue")
         nonce_str = f"{ colored_nonce } {self.nonce}"
         print(f"| {nonce_str.ljust(88)} |")
 
-        readable_time = datetime.fromtimestamp(self.start_time).strftime('%Y-%m-%d %H:%M:%S.%f')
+        readable_time = datetime.fromtimestamp(self.confirm_time).strftime('%Y-%m-%d %H:%M:%S.%f')
         colored_confirm_time = colored("Confirm time:", "blue")
         confirm_time_str = f"{ colored_confirm_time } {self.confirm_time} ({ readable_time })"
         print(f"| {confirm_time_str.ljust(88)} |")
 
+        if self.producer_fingerprint != NO_PRODUCER:
+            # The producer key does not fit in the box, so the fingerprint of the header is shown
+            colored_producer = colored("Producer:", "blue")
+            producer_str = f"{ colored_producer } { format_fingerprint(self.producer_fingerprint) }"
+            print(f"| {producer_str.ljust(88)} |")
+
         this_block_hash = colored(Block.hash_block(self), "green")
         colored_hash_result = colored("Hash result:", "blue")
         hash_str = f"{ colored_hash_result }   {this_block_hash}"
@@ -206,25 +658,39 @@ if __name__ == "__main__":
     clear_console()  # Clear the console for a fresh start
 
     blockchain: list[Block] = []
+    producer_key = SIGNERS[SIGNING_SCHEME].generate() if SIGNING_SCHEME else None
+
+    # Imported here because chain_store.py imports this file
+    from chain_store import ChainStore
+    store = ChainStore(CHAIN_DIRECTORY) if CHAIN_DIRECTORY else None
+
+    if store is not None and len(store) > 0:
+        # Continue the chain saved on disk from its last block
+        blockchain.append(store.tip())
+        print(f"Loaded { len(store) } blocks from { CHAIN_DIRECTORY }, the system will generate { NUMBER_OF_BLOCKS - 1 } more blocks with difficulty: { DIFFICULTY }\n")
+    else:
+        print(f"The system will generate {NUMBER_OF_BLOCKS} blocks in total, including the genesis block with difficulty: { DIFFICULTY }\n")
+        input("Press any key and Enter to generate the genesis block...")
+        clear_console()  # Clear the console for a fresh start
 
-    print(f"The system will generate {NUMBER_OF_BLOCKS} blocks in total, including the genesis block with difficulty: { DIFFICULTY }\n")
-    input("Press any key and Enter to generate the genesis block...")
-    clear_console()  # Clear the console for a fresh start
-
-    # Create the genesis block and append it to the blockchain
-    genesis_block = Block.generate_block()
-    blockchain.append(genesis_block)
-    genesis_block.beautiful_print()  # Print the genesis block in a beautiful way
+        # Create the genesis block and append it to the blockchain
+        genesis_block = Block.generate_block(private_key=producer_key)
+        blockchain.append(genesis_block)
+        if store is not None: store.append(genesis_block)
+        genesis_block.beautiful_print()  # Print the genesis block in a beautiful way
 
     for index in range(1, NUMBER_OF_BLOCKS):
         input("Press any key and Enter to generate the next block...")
         clear_console()  # Clear the console for a fresh start
 
         # Generate a new block with random data and the previous block
-        block = Block.generate_block(data=random_string(), previous_block=blockchain[-1])
+        block = Block.generate_block(data=random_string(), previous_block=blockchain[-1], private_key=producer_key)
         blockchain.append(block)
+        if store is not None: store.append(block)
         block.beautiful_print()  # Print each block in a beautiful way
 
+    if store is not None: store.close()
+
     print("\nAll blocks have been generated successfully!\n")
     input("Press any key and Enter to print the blockchain...")
     clear_console()  # Clear the console for a fresh start
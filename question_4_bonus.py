@@ -6,30 +6,50 @@
 # The first block (genesis block) will be mined first, then the rest of the blocks will be mined concurrently.
 # By using the data of the block, you could see the mining process happening not in order at all
 # but any block be successfully mined will be added to the blockchain
+#
+# The blocks are mined by separate processes, so they really run in parallel. The tip of the chain (the hash and counter
+# of the last block) is shared between them with a version number. A miner only rebuilds its header when the version changes,
+# and it can only append its block if the version is still the one it mined on (compare-and-swap),
+# otherwise it restarts on the new tip. That way two miners can never extend the same tip (no fork).
 
 from time import time as unix_time
 from hashlib import md5, sha256
-from typing import  Optional
+from typing import  Callable, Optional
 from termcolor import colored
 from datetime import datetime
 import os
-from concurrent.futures import ThreadPoolExecutor
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Array, Lock, Value
 
 
 
 DIFFICULTY: int = 3
 DEFAULT_NONCE: int = 0
-GENESIS_PREVIOUS_HASH: str = "0"
+GENESIS_PREVIOUS_HASH: str = "0" * 64
 GENESIS_DATA: str = "Genesis block"
 NUMBER_OF_BLOCKS: int = 5 # Edit this to change the number of blocks to be created in the main function
 
-# Turn on this for cool effect! But it will slow down the mining process.
-# If you turn on the DEBUG mode, the mining process will print the hash in a colored format and amount of time used to mine the nonce.
-# I suggest you lower the DIFFICULTY to 2 or 3 for a better experience if you want to see the effect.
+# Turn on this to see the amount of time used to mine every block, its hash rate
+# and how many times it had to restart because another block won the tip first.
 DEBUG: bool = True
 
 BLOCKCHAIN: list["Block"] = [] # This will hold the blockchain
 
+# The binary block header: block counter, block ID (raw MD5), timestamp, SHA-256 of the data,
+# previous hash (raw SHA-256) and nonce. It is 104 bytes and the block hash is computed over it.
+HEADER_STRUCT = struct.Struct(">Q16sd32s32sQ")
+HEADER_PREFIX_STRUCT = struct.Struct(">Q16sd32s32s") # The header without the nonce
+NONCE_STRUCT = struct.Struct(">Q")
+STOP_CHECK_INTERVAL: int = 1024 # How often (in nonces) a miner checks if the tip of the chain changed
+
+# The human-readable string format of the block, see Block.__str__
+BLOCK_STRING_PATTERN = re.compile(
+    r"^ID: (?P<block_id>\S+) \| Timestamp: (?P<timestamp>\d+) \| Data: (?P<data>.*) \| Previous: (?P<previous_hash>\S+) \| None: (?P<nonce>\d+)$",
+    re.DOTALL,
+)
+
 
 
 def clear_console() -> None:
@@ -51,7 +71,57 @@ def print_arrow_up() -> None:
 
 
 
+# The shared tip of the chain, it is set by the initializer of every mining process
+_tip_lock = None # Held while the tip is read or swapped
+_tip_version = None # Increased every time a block is appended
+_tip_hash = None # The raw hash of the last block
+_tip_counter = None # The block counter of the last block
+
+
+def _init_mining_worker(tip_lock, tip_version, tip_hash, tip_counter) -> None:
+    """This function stores the shared tip of the chain inside each mining process."""
+    global _tip_lock, _tip_version, _tip_hash, _tip_counter
+    _tip_lock, _tip_version, _tip_hash, _tip_counter = tip_lock, tip_version, tip_hash, tip_counter
+
+
+def _mine_on_shared_tip(block: "Block", difficulty: int) -> tuple["Block", int, int]:
+    """
+    This function mines the block on the shared tip inside a mining process.
+    The previous hash is only read again when the tip version changes, and the block is appended
+    with a compare-and-swap on the version, so a miner holding stale work restarts instead of making a fork.
+    It returns the mined block, the number of attempts and the number of restarts.
+    """
+    attempts = 0
+    restarts = 0
+    while True:
+        # Take a consistent snapshot of the tip
+        with _tip_lock:
+            version = _tip_version.value
+            block.previous_hash = bytes(_tip_hash).hex()
+            block.block_counter = _tip_counter.value + 1
+        block.timestamp = unix_time()
+
+        nonce, tried = block.search_nonce(difficulty, lambda: _tip_version.value != version)
+        attempts += tried
+        if nonce is not None:
+            block.nonce = nonce
+            with _tip_lock:
+                if _tip_version.value == version:
+                    # Nobody appended in the meantime, so this block becomes the new tip
+                    _tip_hash[:] = sha256(block.header_bytes()).digest()
+                    _tip_counter.value = block.block_counter
+                    _tip_version.value = version + 1
+                    return block, attempts, restarts
+
+        # Another miner extended the tip first, start again on the new tip
+        restarts += 1
+
+
+
 class Block:
+    # The fields are stored in slots instead of a __dict__, which saves memory when the chain gets long
+    __slots__ = ("block_counter", "block_id", "timestamp", "data", "previous_hash", "nonce", "start_time", "end_time")
+
     block_counter: int  # Static variable to keep track of the number of blocks created
     block_id: str
     timestamp: float # UNIX timestamp 
@@ -88,67 +158,141 @@ class Block:
 
 
     def mine(self) -> None:
-        """This method mines the block by finding a nonce that satisfies the difficulty requirement."""
+        """
+        This method mines the block on top of the BLOCKCHAIN in this process by finding a nonce that satisfies the difficulty requirement.
+        The previous hash is only computed again when the chain grows.
+        """
         print(f"\nMining block { self.block_id }...")
 
         self.start_time = unix_time()
-        previous_block = BLOCKCHAIN[-1] if BLOCKCHAIN else None
-        
-        # Set the timestamp, block counter, and previous hash based on the previous block
-        self.timestamp = unix_time()  # Set the current timestamp
-        self.block_counter = 0 if previous_block is None else previous_block.block_counter + 1
-        self.previous_hash = GENESIS_PREVIOUS_HASH if previous_block is None else Block.hash_block(previous_block)
-
-        # Hash the block and check if it starts with the required number of zeros
-        hash_result = Block.hash_block(self)
-        while not hash_result.startswith('0' * DIFFICULTY):
-            # Updating the nonce and timestamp
-            self.nonce += 1
-
-            # Updating the previous hash and block counter
+        attempts = 0
+        while True:
+            chain_length = len(BLOCKCHAIN)
             previous_block = BLOCKCHAIN[-1] if BLOCKCHAIN else None
-            self.timestamp = unix_time()  # Update the timestamp to the current time
+
+            # Set the timestamp, block counter, and previous hash based on the previous block
+            self.timestamp = unix_time()  # Set the current timestamp
             self.block_counter = 0 if previous_block is None else previous_block.block_counter + 1
             self.previous_hash = GENESIS_PREVIOUS_HASH if previous_block is None else Block.hash_block(previous_block)
 
-            hash_result = Block.hash_block(self)
-
-            # Where the cool effect happens
-            if DEBUG:
-                console_hash_output: list = []
-                for index in range(DIFFICULTY):
-                    if hash_result[index] == '0':
-                        console_hash_output.append(colored(hash_result[index], 'green'))
-                    else:
-                        console_hash_output.append(colored(hash_result[index], 'red'))
-                # Append the rest of the hash
-                console_hash_output += hash_result[DIFFICULTY:]
-                print(f"\rMining block { self.block_id } with nonce { self.nonce }: { ''.join(console_hash_output) }", end='\n')
+            nonce, tried = self.search_nonce(DIFFICULTY, lambda: len(BLOCKCHAIN) != chain_length)
+            attempts += tried
+            if nonce is not None and len(BLOCKCHAIN) == chain_length:
+                self.nonce = nonce
+                break
 
         # Adding the mined block to the blockchain
-        print(f"\nBlock { self.block_id } mined with nonce { self.nonce } and hash { hash_result }")
+        print(f"\nBlock { self.block_id } mined with nonce { self.nonce } and hash { Block.hash_block(self) }")
         BLOCKCHAIN.append(self)
         self.end_time = unix_time()
 
         if DEBUG:
-            consume_time = self.end_time - self.start_time
-            consume_time = colored(f"{consume_time:.2f} seconds", "yellow")
-            # Print the time taken to mine the block
-            print(f"\nBlock { self.block_id } mined in { consume_time }.")
-
-            hash_rate = self.nonce / (self.end_time - self.start_time)
-            hash_rate = colored(f"{hash_rate:.2f} hashes/second", "yellow")
-            print(f"Hash rate: { hash_rate }")
+            self.print_statistics(attempts)
 
         # Print 2 empy lines for better readability
         print("\n\n", end="")
-                    
-    
+
+
+    def print_statistics(self, attempts: int, restarts: int = 0) -> None:
+        """This method prints the time used to mine the block and the hash rate."""
+        consume_time = self.end_time - self.start_time
+        colored_consume_time = colored(f"{consume_time:.2f} seconds", "yellow")
+        # Print the time taken to mine the block
+        print(f"Block { self.block_id } mined in { colored_consume_time } after { restarts } restarts.")
+
+        hash_rate = attempts / consume_time if consume_time > 0 else 0.0
+        hash_rate = colored(f"{hash_rate:.2f} hashes/second", "yellow")
+        print(f"Hash rate: { hash_rate }")
+
+
+    def search_nonce(self, difficulty: int, is_stale: Callable[[], bool]) -> tuple[Optional[int], int]:
+        """
+        This method searches the nonce from the default nonce for the current header, and returns it with the number of attempts.
+        The header before the nonce is fed into SHA-256 once, every attempt only hashes the nonce.
+        The raw digest is compared with the target as bytes (like question_4.py), which does not need hexdigest().
+        Every STOP_CHECK_INTERVAL nonces it checks is_stale() and gives up (returns None) if the tip has changed.
+        """
+        midstate = sha256(HEADER_PREFIX_STRUCT.pack(
+            self.block_counter,
+            bytes.fromhex(self.block_id),
+            self.timestamp,
+            sha256(self.data.encode()).digest(),
+            bytes.fromhex(self.previous_hash),
+        ))
+        # A hash with `difficulty` leading hexadecimal zeros is a hash not above this 256-bit target
+        target_bytes = (2 ** (256 - 4 * difficulty) - 1).to_bytes(32, "big")
+        copy_state = midstate.copy
+        pack_nonce = NONCE_STRUCT.pack
+
+        chunk_start = DEFAULT_NONCE
+        while not is_stale():
+            for nonce in range(chunk_start, chunk_start + STOP_CHECK_INTERVAL):
+                state = copy_state()
+                state.update(pack_nonce(nonce))
+                if state.digest() <= target_bytes:
+                    return nonce, nonce - DEFAULT_NONCE + 1
+            chunk_start += STOP_CHECK_INTERVAL
+
+        return None, chunk_start - DEFAULT_NONCE
+
+
     @classmethod
     def hash_block(cls, block: "Block") -> str:
-        """This method hashes the block using SHA-256."""
-        return sha256(str(block).encode()).hexdigest()
-    
+        """This method hashes the binary header of the block using SHA-256."""
+        return sha256(block.header_bytes()).hexdigest()
+
+
+    def header_bytes(self) -> bytes:
+        """This method packs the block header into its fixed 104-byte binary form."""
+        return HEADER_STRUCT.pack(
+            self.block_counter,
+            bytes.fromhex(self.block_id),
+            self.timestamp,
+            sha256(self.data.encode()).digest(),
+            bytes.fromhex(self.previous_hash),
+            self.nonce,
+        )
+
+
+    @classmethod
+    def from_header(cls, header: bytes, data: str) -> "Block":
+        """
+        This method rebuilds a block from its binary header and its data.
+        The header only keeps the hash of the data, so the data must be given and it must match that hash.
+        """
+        block_counter, block_id, timestamp, data_hash, previous_hash, nonce = HEADER_STRUCT.unpack(header)
+        if sha256(data.encode()).digest() != data_hash:
+            raise ValueError("The data does not match the data hash in the header")
+
+        block = cls.__new__(cls)
+        block.block_counter = block_counter
+        block.block_id = block_id.hex()
+        block.timestamp = timestamp
+        block.data = data
+        block.previous_hash = previous_hash.hex()
+        block.nonce = nonce
+        return block
+
+
+    @classmethod
+    def from_string(cls, text: str, block_counter: int) -> "Block":
+        """
+        This method rebuilds a block from its string representation (see __str__).
+        The string does not contain the block counter, so it must be given, and the timestamp is only kept in seconds.
+        """
+        match = BLOCK_STRING_PATTERN.match(text)
+        if match is None:
+            raise ValueError("The text is not a block in the string format")
+
+        block = cls.__new__(cls)
+        block.block_counter = block_counter
+        block.block_id = match["block_id"]
+        block.timestamp = float(match["timestamp"])
+        block.data = match["data"]
+        block.previous_hash = match["previous_hash"]
+        block.nonce = int(match["nonce"])
+        return block
+
 
     def __str__(self, show_human_time: bool = False) -> str:
         """This method returns a string representation of the block."""
@@ -194,6 +338,50 @@ class Block:
 
 
 
+class MiningCoordinator:
+    """
+    This class mines many blocks at the same time with a process pool on top of a chain.
+    It publishes the tip of the chain to the mining processes through shared memory.
+    """
+    chain: list[Block]
+    workers: int
+
+
+    def __init__(self, chain: list[Block], workers: int = os.cpu_count() or 1) -> None:
+        if not chain:
+            raise ValueError("The chain must have at least the genesis block")
+        self.chain = chain
+        self.workers = workers
+
+        self.tip_lock = Lock()
+        self.tip_version = Value('Q', 0, lock=False)
+        self.tip_hash = Array('B', sha256(chain[-1].header_bytes()).digest(), lock=False)
+        self.tip_counter = Value('q', chain[-1].block_counter, lock=False)
+
+
+    def mine_blocks(self, blocks: list[Block]) -> None:
+        """This method mines all the blocks concurrently and appends them to the chain in the order they win the tip."""
+        mined: list[Block] = []
+        initargs = (self.tip_lock, self.tip_version, self.tip_hash, self.tip_counter)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_mining_worker, initargs=initargs) as executor:
+            futures = []
+            for block in blocks:
+                block.start_time = unix_time()
+                futures.append(executor.submit(_mine_on_shared_tip, block, DIFFICULTY))
+
+            for future in as_completed(futures):
+                block, attempts, restarts = future.result()
+                block.end_time = unix_time()
+                print(f"\nBlock { block.block_id } mined with nonce { block.nonce } and hash { Block.hash_block(block) }")
+                if DEBUG:
+                    block.print_statistics(attempts, restarts)
+                mined.append(block)
+
+        # The block counters give the order in which the blocks won the tip
+        self.chain.extend(sorted(mined, key=lambda block: block.block_counter))
+
+
+
 if __name__ == "__main__":
 
     # Generate the genesis block and add it to the blockchain
@@ -203,11 +391,8 @@ if __name__ == "__main__":
     # Generate the rest of the blocks
     blocks = [Block.generate_block(data=f"Block { index+1 } data") for index in range(NUMBER_OF_BLOCKS - 1)]
 
-    # Multi-threading to simulate concurrent mining
-    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
-        futures = [executor.submit(block.mine) for block in blocks]
-        for future in futures:
-            future.result()
+    # Multi-processing to mine the blocks concurrently
+    MiningCoordinator(BLOCKCHAIN).mine_blocks(blocks)
 
     clear_console()  # Clear the console for a fresh start
     # Print the blockchain
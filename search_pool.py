@@ -0,0 +1,77 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: hash_cracker.py and wordlist_attack.py both search a set of target digests with a process pool, task by task
+# (ranges of candidates for one, segments of a wordlist for the other). This module has the pool loop they share:
+# the stop event and the targets are sent once to every process by the initializer, every idle worker gets the next task,
+# every result is given back to the caller as soon as its task finished, and Ctrl+C or the caller stop the search.
+# The tasks that did not finish are returned, so the caller knows where to resume.
+
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import Event
+from typing import Callable, Iterator
+
+
+Task = dict # The keyword arguments of one call of the search function (besides targets and stop_event)
+
+
+# The stop event and the target digests shared by all the search processes, they are set by the initializer of the process pool
+_stop_event = None
+_targets: frozenset[bytes] = frozenset()
+
+
+def _init_search_worker(stop_event, targets: frozenset[bytes]) -> None:
+    """This function stores the shared stop event and the target digests inside each search process, so they are only sent once."""
+    global _stop_event, _targets
+    _stop_event = stop_event
+    _targets = targets
+
+
+def _search_in_worker(search: Callable, task: Task):
+    """This function runs one task inside a worker process."""
+    return search(**task, targets=_targets, stop_event=_stop_event)
+
+
+def run_search(search: Callable, tasks: Iterator[Task], targets: frozenset[bytes], workers: int, on_result: Callable[[Task, object, list[Task]], bool], queued_per_worker: int = 1) -> list[Task]:
+    """
+    This function calls search(**task, targets=..., stop_event=...) for every task on a pool of processes, the search function
+    must be defined at the top level of its module. Every worker keeps queued_per_worker tasks, and the next task is only
+    taken from the iterator when a task finished, so the iterator can be endless.
+    Every result is given to on_result with its task and the tasks still running, in the main process. When on_result returns
+    False (e.g. every target matched), or on Ctrl+C, the running workers are stopped and the queued tasks are cancelled.
+    It returns the tasks that did not finish.
+    """
+    stop_event = Event()
+    unfinished: dict[Future, Task] = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker, initargs=(stop_event, targets)) as executor:
+        def submit() -> None:
+            """This function gives the next task to a worker, if there is one."""
+            task = next(tasks, None)
+            if task is not None:
+                unfinished[executor.submit(_search_in_worker, search, task)] = task
+
+        for _ in range(queued_per_worker * workers):
+            submit()
+
+        searching = True
+        try:
+            while unfinished and searching:
+                done, _ = wait(unfinished, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # A task only counts as finished once its result arrived, a task interrupted by Ctrl+C stays unfinished
+                    result = future.result()
+                    task = unfinished.pop(future)
+                    searching = on_result(task, result, list(unfinished.values())) and searching
+                if searching:
+                    for _ in done:
+                        submit()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Tell the running workers to stop and drop the tasks that have not started yet
+            stop_event.set()
+            for future in unfinished:
+                future.cancel()
+
+    return list(unfinished.values())
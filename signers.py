@@ -0,0 +1,217 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: question_3.py only signs with RSA-2048 and PSS. This module gives the same sign/verify/serialize methods for
+# three signature schemes, so the code that signs does not depend on the kind of key:
+# - "rsa-pss": the functions of question_3.py (slow key generation and signing, 256-byte signatures),
+# - "ed25519": Ed25519 (fast key generation and signing, 64-byte signatures),
+# - "ecdsa-p256": ECDSA on the P-256 curve with SHA-256 (about 72-byte DER signatures).
+# The keys are saved like in question_3.py (OpenSSH public keys and PKCS#8 private keys), which works for all of them.
+# Run `python3 signers.py` to compare the speed of the key generation, signing and verification and the size of the signatures.
+
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+import argparse
+import json
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+import question_3
+
+
+PrivateKey = Union[rsa.RSAPrivateKey, ed25519.Ed25519PrivateKey, ec.EllipticCurvePrivateKey]
+PublicKey = Union[rsa.RSAPublicKey, ed25519.Ed25519PublicKey, ec.EllipticCurvePublicKey]
+
+
+class Signer(ABC):
+    """
+    This class is the common interface of the signature schemes. The subclasses generate keys, sign and verify,
+    the serialization is the same for all the schemes.
+    """
+    name: str
+    private_key_type: type
+    public_key_type: type
+
+
+    @abstractmethod
+    def generate(self) -> PrivateKey:
+        """This method generates a new private key, the public key can be get from it."""
+
+
+    @abstractmethod
+    def sign(self, private_key: PrivateKey, message: bytes) -> bytes:
+        """This method signs the message with the private key."""
+
+
+    @abstractmethod
+    def verify(self, public_key: PublicKey, message: bytes, signature: bytes) -> bool:
+        """This method verifies the signature of the message with the public key, it returns True if it is valid."""
+
+
+    def accepts(self, key: Union[PrivateKey, PublicKey]) -> bool:
+        """This method returns True if the private or public key is a key of this scheme."""
+        return isinstance(key, (self.private_key_type, self.public_key_type))
+
+
+    def public_bytes(self, public_key: PublicKey) -> bytes:
+        """This method returns the public key in OpenSSH format."""
+        return public_key.public_bytes(encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH)
+
+
+    def private_bytes(self, private_key: PrivateKey, password: Optional[bytes] = None) -> bytes:
+        """This method returns the private key as PKCS#8 PEM, encrypted with the password if there is one."""
+        return question_3.serialize_private_key(private_key, password)
+
+
+    def load_public_key(self, data: bytes) -> PublicKey:
+        """This method loads a public key in OpenSSH or PEM format, it raises ValueError if it is not a key of this scheme."""
+        key = serialization.load_pem_public_key(data) if data.startswith(b"-----BEGIN") else serialization.load_ssh_public_key(data)
+        if not isinstance(key, self.public_key_type) or not self.accepts(key):
+            raise ValueError(f"The public key is not an { self.name } key")
+        return key
+
+
+    def load_private_key(self, data: bytes, password: Optional[bytes] = None) -> PrivateKey:
+        """This method loads a PEM private key, it raises ValueError if it is not a key of this scheme."""
+        key = serialization.load_pem_private_key(data, password=password)
+        if not isinstance(key, self.private_key_type) or not self.accepts(key):
+            raise ValueError(f"The private key is not an { self.name } key")
+        return key
+
+
+class RSAPSSSigner(Signer):
+    """RSA-2048 with PSS and SHA-256, the scheme of question_3.py."""
+    name = "rsa-pss"
+    private_key_type = rsa.RSAPrivateKey
+    public_key_type = rsa.RSAPublicKey
+
+
+    def generate(self) -> rsa.RSAPrivateKey:
+        return question_3.generate_key_pair()
+
+
+    def sign(self, private_key: rsa.RSAPrivateKey, message: bytes) -> bytes:
+        return question_3.sign_message(private_key, message)
+
+
+    def verify(self, public_key: rsa.RSAPublicKey, message: bytes, signature: bytes) -> bool:
+        return question_3.verify_signature(public_key, message, signature)
+
+
+class Ed25519Signer(Signer):
+    """Ed25519, the hash is part of the scheme."""
+    name = "ed25519"
+    private_key_type = ed25519.Ed25519PrivateKey
+    public_key_type = ed25519.Ed25519PublicKey
+
+
+    def generate(self) -> ed25519.Ed25519PrivateKey:
+        return ed25519.Ed25519PrivateKey.generate()
+
+
+    def sign(self, private_key: ed25519.Ed25519PrivateKey, message: bytes) -> bytes:
+        return private_key.sign(message)
+
+
+    def verify(self, public_key: ed25519.Ed25519PublicKey, message: bytes, signature: bytes) -> bool:
+        try:
+            public_key.verify(signature, message)
+            return True
+        except InvalidSignature:
+            return False
+
+
+class ECDSAP256Signer(Signer):
+    """ECDSA on the P-256 curve with SHA-256, the signatures are DER encoded."""
+    name = "ecdsa-p256"
+    private_key_type = ec.EllipticCurvePrivateKey
+    public_key_type = ec.EllipticCurvePublicKey
+    SIGNATURE_ALGORITHM = ec.ECDSA(question_3.HASH_ALGORITHM) # Created once, like the paddings of question_3.py
+
+
+    def generate(self) -> ec.EllipticCurvePrivateKey:
+        return ec.generate_private_key(ec.SECP256R1())
+
+
+    def accepts(self, key: Union[ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey]) -> bool:
+        # The key types of cryptography are the same for all the curves, only the P-256 keys belong to this scheme
+        return super().accepts(key) and isinstance(key.curve, ec.SECP256R1)
+
+
+    def sign(self, private_key: ec.EllipticCurvePrivateKey, message: bytes) -> bytes:
+        return private_key.sign(message, self.SIGNATURE_ALGORITHM)
+
+
+    def verify(self, public_key: ec.EllipticCurvePublicKey, message: bytes, signature: bytes) -> bool:
+        try:
+            public_key.verify(signature, message, self.SIGNATURE_ALGORITHM)
+            return True
+        except InvalidSignature:
+            return False
+
+
+SIGNERS: dict[str, Signer] = {signer.name: signer for signer in (RSAPSSSigner(), Ed25519Signer(), ECDSAP256Signer())}
+DEFAULT_SIGNER: str = "rsa-pss" # The scheme of question_3.py
+
+
+def signer_for_key(key: Union[PrivateKey, PublicKey]) -> Signer:
+    """This function returns the signer of a private or public key, it raises ValueError for other kinds of keys."""
+    for signer in SIGNERS.values():
+        if signer.accepts(key):
+            return signer
+    raise ValueError(f"Unsupported key type: { type(key).__name__ }")
+
+
+def compare(operations: int, repetitions: int = 5, warmup: int = 1) -> dict[str, dict]:
+    """
+    This function measures the key generation, signing and verification of every scheme with measure() of benchmark.py,
+    and the size of its signatures and public keys.
+    """
+    from benchmark import measure # benchmark.py imports the whole project, so it is only imported when it is used
+
+    message = b"Benchmark message"
+    results: dict[str, dict] = {}
+
+    def repeat(function, times: int = operations):
+        def run() -> int:
+            for _ in range(times):
+                function()
+            return times
+        return run
+
+    for name, signer in SIGNERS.items():
+        private_key = signer.generate()
+        public_key = private_key.public_key()
+        signature = signer.sign(private_key, message)
+
+        # RSA keys are much slower to generate, so every repetition generates only a few of them
+        keygen_operations = max(1, operations // 50) if name == "rsa-pss" else operations
+        results[name] = {
+            "signature_bytes": len(signature),
+            "public_key_bytes": len(signer.public_bytes(public_key)),
+            "keygen_per_second": measure(repeat(signer.generate, keygen_operations), repetitions, warmup)["operations_per_second"],
+            "sign_per_second": measure(repeat(lambda: signer.sign(private_key, message)), repetitions, warmup)["operations_per_second"],
+            "verify_per_second": measure(repeat(lambda: signer.verify(public_key, message, signature)), repetitions, warmup)["operations_per_second"],
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the speed and the sizes of the RSA-PSS, Ed25519 and ECDSA-P256 signatures.")
+    parser.add_argument("--operations", type=int, default=200, help="number of operations per repetition")
+    parser.add_argument("--repetitions", type=int, default=5, help="number of measured repetitions")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    arguments = parser.parse_args()
+
+    results = compare(arguments.operations, arguments.repetitions)
+    if arguments.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{ 'Scheme':<12}{ 'Keygen/s':>12}{ 'Sign/s':>12}{ 'Verify/s':>12}{ 'Signature':>11}{ 'Public key':>12}")
+        for name, result in results.items():
+            print(
+                f"{ name:<12}{ result['keygen_per_second']:>12,.0f}{ result['sign_per_second']:>12,.0f}"
+                f"{ result['verify_per_second']:>12,.0f}{ result['signature_bytes']:>10} B{ result['public_key_bytes']:>10} B"
+            )
@@ -0,0 +1,97 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is a batch API around the signing and verification of question_3.py, without the input() prompts.
+# The messages are split into chunks that are signed or verified by a pool of threads. The RSA operations run inside
+# OpenSSL, which releases the GIL, so the threads use more than one core. Example:
+#   with SigningService() as service:
+#       signed = service.sign_many(private_key, messages)
+#       verified = service.verify_many(private_key.public_key(), messages, signed.results)
+#       print(verified.operations_per_second)
+
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Generic, Sequence, TypeVar
+import os
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from question_3 import sign_message, verify_signature
+
+
+CHUNK_SIZE: int = 32 # Number of messages handled by one task, so the cost of a task is small next to the RSA operations
+
+Result = TypeVar("Result")
+
+
+class BatchResult(Generic[Result]):
+    """The results of a batch, in the order of the messages, with the time it took."""
+    results: list[Result]
+    elapsed: float # Seconds
+
+
+    def __init__(self, results: list[Result], elapsed: float) -> None:
+        self.results = results
+        self.elapsed = elapsed
+
+
+    @property
+    def operations_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+    def to_dict(self) -> dict:
+        """This method returns the throughput of the batch, e.g. to save it as JSON."""
+        return {"operations": len(self.results), "elapsed_seconds": self.elapsed, "operations_per_second": self.operations_per_second}
+
+
+def _chunks(items: Sequence, size: int) -> list[Sequence]:
+    """This function splits the items into chunks of the given size."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class SigningService:
+    """This class signs and verifies batches of messages with a thread pool that is kept between the batches."""
+    workers: int
+
+
+    def __init__(self, workers: int = os.cpu_count() or 1) -> None:
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="signer")
+
+
+    def __enter__(self) -> "SigningService":
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """This method stops the threads."""
+        self._executor.shutdown(wait=True)
+
+
+    def sign_many(self, private_key: rsa.RSAPrivateKey, messages: Sequence[bytes]) -> BatchResult[bytes]:
+        """This method signs every message with RSA-PSS and SHA-256 and returns the signatures in the order of the messages."""
+        def sign_chunk(chunk: Sequence[bytes]) -> list[bytes]:
+            return [sign_message(private_key, message) for message in chunk]
+
+        start = perf_counter()
+        signatures = [signature for chunk in self._executor.map(sign_chunk, _chunks(messages, CHUNK_SIZE)) for signature in chunk]
+        return BatchResult(signatures, perf_counter() - start)
+
+
+    def verify_many(self, public_key: rsa.RSAPublicKey, messages: Sequence[bytes], signatures: Sequence[bytes]) -> BatchResult[bool]:
+        """This method verifies the signature of every message and returns True or False for every message, in their order."""
+        if len(messages) != len(signatures):
+            raise ValueError("There must be one signature for every message")
+
+        def verify_chunk(pairs: Sequence[tuple[bytes, bytes]]) -> list[bool]:
+            return [verify_signature(public_key, message, signature) for message, signature in pairs]
+
+        start = perf_counter()
+        pairs = list(zip(messages, signatures))
+        statuses = [status for chunk in self._executor.map(verify_chunk, _chunks(pairs, CHUNK_SIZE)) for status in chunk]
+        return BatchResult(statuses, perf_counter() - start)
@@ -0,0 +1,185 @@
+# Student ID: S4032825
+# Student name: Dinh Ngoc Hoang Cuong
+
+# NOTE: This is a dictionary attack: instead of the sequence of question_1.py, the candidates are the lines of a wordlist,
+# optionally changed by mangling rules (case changes and digit suffixes). The wordlist is mapped with mmap and cut into
+# segments at line boundaries, every worker process maps the file itself and splits its segment into lines in big blocks
+# (bytes.split runs in C), so a big wordlist is never read line by line with Python I/O. Example:
+#   python3 wordlist_attack.py rockyou.txt --targets hashes.txt --rules case digits --workers 4
+
+from hashlib import sha256
+from time import perf_counter
+from typing import Callable, Iterator, Optional
+import argparse
+import mmap
+import os
+
+from hash_cracker import load_targets
+from search_pool import Task, run_search
+
+
+SEGMENT_SIZE: int = 64 * 1024 * 1024 # The bytes of the wordlist searched by one task of a worker process
+READ_SIZE: int = 4 * 1024 * 1024 # The bytes split into lines at once inside a segment
+DIGIT_SUFFIXES: tuple[bytes, ...] = tuple(str(number).encode() for number in range(100)) # "0" to "99"
+RULES: tuple[str, ...] = ("case", "digits")
+
+
+def mangle(word: bytes, rules: tuple[str, ...]) -> Iterator[bytes]:
+    """
+    This function yields the word and its variants from the mangling rules, without duplicates:
+    - "case": lowercase, uppercase, capitalized and swapped case,
+    - "digits": every variant followed by one of DIGIT_SUFFIXES.
+    """
+    variants = [word]
+    if "case" in rules:
+        for variant in (word.lower(), word.upper(), word.capitalize(), word.swapcase()):
+            if variant not in variants:
+                variants.append(variant)
+    yield from variants
+
+    if "digits" in rules:
+        for variant in variants:
+            for suffix in DIGIT_SUFFIXES:
+                yield variant + suffix
+
+
+def segments(path: str, segment_size: int = SEGMENT_SIZE) -> list[tuple[int, int]]:
+    """This function cuts the file into segments (start and end offsets) of about the segment size that end at a line boundary."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    result: list[tuple[int, int]] = []
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            newline = data.find(b"\n", min(start + segment_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            result.append((start, end))
+            start = end
+    return result
+
+
+class AttackResult:
+    """The result of a wordlist attack: the matches, the number of candidates and bytes tested and the time."""
+    matches: list[tuple[bytes, bytes]] # The word and the digest of every match, in the order they were found
+    attempts: int # Number of candidates hashed (words and their variants)
+    bytes_read: int # Number of bytes of the wordlist searched
+    elapsed: float # Seconds
+
+
+    def __init__(self, matches: list[tuple[bytes, bytes]], attempts: int, bytes_read: int, elapsed: float) -> None:
+        self.matches = matches
+        self.attempts = attempts
+        self.bytes_read = bytes_read
+        self.elapsed = elapsed
+
+
+    @property
+    def candidates_per_second(self) -> float:
+        return self.attempts / self.elapsed if self.elapsed > 0 else 0.0
+
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_read / 1024 / 1024 / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def search_segment(path: str, start: int, end: int, targets: frozenset[bytes], rules: tuple[str, ...] = (), stop_event = None) -> tuple[list[tuple[bytes, bytes]], int]:
+    """
+    This function hashes every line of the segment (and its variants) and looks up the digests in the set of targets.
+    It returns the matches (word and digest) and the number of candidates hashed. The stop event is checked once per block.
+    """
+    matches: list[tuple[bytes, bytes]] = []
+    attempts = 0
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if hasattr(data, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            data.madvise(mmap.MADV_SEQUENTIAL) # Let the kernel read ahead
+
+        position = start
+        while position < end:
+            if stop_event is not None and stop_event.is_set():
+                break
+
+            # Cut the block after its last newline, so no line is split between two blocks
+            block_end = min(position + READ_SIZE, end)
+            if block_end < end:
+                newline = data.rfind(b"\n", position, block_end)
+                block_end = newline + 1 if newline != -1 else data.find(b"\n", block_end, end) + 1 or end
+
+            for line in data[position:block_end].split(b"\n"):
+                word = line[:-1] if line.endswith(b"\r") else line
+                if not word:
+                    continue
+                if rules:
+                    for candidate in mangle(word, rules):
+                        digest = sha256(candidate).digest()
+                        attempts += 1
+                        if digest in targets:
+                            matches.append((candidate, digest))
+                else:
+                    digest = sha256(word).digest()
+                    attempts += 1
+                    if digest in targets:
+                        matches.append((word, digest))
+            position = block_end
+    return matches, attempts
+
+
+def attack(path: str, targets: set[bytes], rules: tuple[str, ...] = (), workers: int = os.cpu_count() or 1, on_match: Optional[Callable[[bytes, bytes], None]] = None) -> AttackResult:
+    """
+    This function runs the wordlist against the target digests with a process pool, one segment per task.
+    Every match is given to on_match (word and digest) as soon as its segment finishes,
+    and the attack stops early once every target matched. Ctrl+C stops it too.
+    """
+    remaining = set(targets)
+    matches: list[tuple[bytes, bytes]] = []
+    attempts = 0
+    bytes_read = 0
+    begin = perf_counter()
+    tasks = ({"path": path, "start": start, "end": end, "rules": rules} for start, end in segments(path))
+
+    def on_result(task: Task, result: tuple[list[tuple[bytes, bytes]], int], running: list[Task]) -> bool:
+        """This function collects the matches of a finished segment, it returns False once every target matched."""
+        nonlocal attempts, bytes_read
+        segment_matches, tried = result
+        bytes_read += task["end"] - task["start"]
+        attempts += tried
+        for word, digest in segment_matches:
+            if digest in remaining:
+                remaining.discard(digest)
+                matches.append((word, digest))
+                if on_match is not None:
+                    on_match(word, digest)
+        return bool(remaining)
+
+    # Keep a few segments queued per worker, so no worker waits for the next one
+    if remaining:
+        run_search(search_segment, tasks, frozenset(targets), workers, on_result, queued_per_worker=2)
+    return AttackResult(matches, attempts, bytes_read, perf_counter() - begin)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the words of a wordlist whose SHA-256 is the given hash (or one of the hashes of a file).")
+    parser.add_argument("wordlist", help="the wordlist, one word per line")
+    parser.add_argument("hash", nargs="?", help="the SHA-256 hash in hexadecimal")
+    parser.add_argument("--targets", help="a file with one SHA-256 hash per line, all of them are searched at the same time")
+    parser.add_argument("--rules", nargs="*", default=[], choices=RULES, help="the mangling rules applied to every word")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    arguments = parser.parse_args()
+    if (arguments.hash is None) == (arguments.targets is None):
+        parser.error("give either a hash or --targets")
+
+    targets = load_targets(arguments.targets) if arguments.targets else {bytes.fromhex(arguments.hash)}
+
+    def print_match(word: bytes, digest: bytes) -> None:
+        print(f"Hash match found: { word.decode(errors='replace') } ({ digest.hex() })", flush=True)
+
+    print(f"Searching { len(targets) } hashes in { arguments.wordlist } with { arguments.workers } workers, press Ctrl+C to stop...")
+    result = attack(arguments.wordlist, targets, tuple(arguments.rules), arguments.workers, print_match)
+
+    print(f"{ len(result.matches) }/{ len(targets) } hashes found")
+    print(
+        f"{ result.attempts:,} candidates in { result.elapsed:.2f} seconds "
+        f"({ result.candidates_per_second:,.0f} candidates/second, { result.megabytes_per_second:,.1f} MB/second)"
+    )